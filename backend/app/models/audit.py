@@ -0,0 +1,19 @@
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class AuditRecord(BaseModel):
+    id: int = Field(..., description="Audit record ID, increasing over time")
+    created_at: float = Field(..., description="Unix timestamp of the verification")
+    brand_name: str = Field(..., description="Brand name submitted for verification")
+    product_type: str = Field(..., description="Product type submitted")
+    success: bool = Field(..., description="Overall verification result")
+    result: Dict[str, Any] = Field(..., description="Stored VerificationResult")
+
+
+class AuditPage(BaseModel):
+    items: List[AuditRecord] = Field(..., description="Records, newest first")
+    next_cursor: Optional[str] = Field(
+        None, description="Cursor for the next page; null on the last page"
+    )
@@ -32,3 +32,18 @@ class VerificationResult(BaseModel):
         None,
         description="Information about the processed image (dimensions, file size)",
     )
+    field_sources: Dict[str, int] = Field(
+        default_factory=dict,
+        description="Index of the submitted image each matched field was found on",
+    )
+    profile: Optional[Dict[str, Any]] = Field(
+        None,
+        description="Stage timings and call profile, only for inline profiled requests",
+    )
+
+
+# Fields returned when a caller requests the "compact" response preset; omits the
+# OCR text and echoes of data the caller already sent
+COMPACT_RESULT_FIELDS = frozenset(
+    {"success", "matches", "mismatches", "message", "close_matches", "field_sources"}
+)
@@ -0,0 +1,69 @@
+import hmac
+import logging
+import sqlite3
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from starlette.status import (
+    HTTP_400_BAD_REQUEST,
+    HTTP_403_FORBIDDEN,
+    HTTP_404_NOT_FOUND,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
+
+from app.models.audit import AuditPage
+from app.services import audit_service
+from app.services.audit_service import audit_store
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/audit")
+async def list_verifications(
+    request: Request,
+    brand_name: Optional[str] = None,
+    success: Optional[bool] = None,
+    image_digest: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> AuditPage:
+    """
+    Page through verification history, newest first.
+    Pass the returned `next_cursor` as `cursor` to fetch the next page.
+    `since`/`until` are Unix timestamps; `limit` is capped at AUDIT_MAX_PAGE_SIZE.
+    Requires an X-Admin-Token header matching AUDIT_ADMIN_TOKEN.
+    """
+    token = request.headers.get("X-Admin-Token", "")
+    admin_token = audit_service.AUDIT_ADMIN_TOKEN
+    if not admin_token or not hmac.compare_digest(token, admin_token):
+        raise HTTPException(
+            status_code=HTTP_403_FORBIDDEN,
+            detail="Audit history requires a valid admin token",
+        )
+
+    if audit_store is None:
+        raise HTTPException(
+            status_code=HTTP_404_NOT_FOUND, detail="Audit history is disabled"
+        )
+
+    try:
+        return await audit_store.query(
+            brand_name=brand_name,
+            success=success,
+            image_digest=image_digest,
+            since=since,
+            until=until,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError:
+        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    except sqlite3.Error as e:
+        logger.error(f"Audit query error: {str(e)}")
+        raise HTTPException(
+            status_code=HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Audit history is unavailable",
+        )
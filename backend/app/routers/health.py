@@ -1,8 +1,22 @@
 from fastapi import APIRouter
 
+from app.services.admission_service import admission_controller
+
 router = APIRouter()
 
 
 @router.get("/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@router.get("/health/admission")
+async def admission_stats():
+    """
+    OCR admission queue depth, outcomes and recent queue waits per traffic class.
+    """
+    return {
+        "concurrency": admission_controller.concurrency,
+        "in_flight": admission_controller.in_flight,
+        "classes": admission_controller.stats(),
+    }
@@ -1,30 +1,69 @@
+import asyncio
+import hashlib
+import hmac
 import io
+import json
 import logging
-from typing import Dict
+import math
+import random
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
 
-from fastapi import APIRouter, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Form, HTTPException, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
 from PIL import Image
+from starlette.concurrency import run_in_threadpool
 from starlette.status import (
     HTTP_400_BAD_REQUEST,
+    HTTP_401_UNAUTHORIZED,
+    HTTP_403_FORBIDDEN,
+    HTTP_408_REQUEST_TIMEOUT,
     HTTP_422_UNPROCESSABLE_CONTENT,
     HTTP_500_INTERNAL_SERVER_ERROR,
 )
 
-from app.models.verification import LabelData, VerificationResult
-from app.services.ocr_service import extract_text_from_image
-from app.services.verification_service import verify_label
+from app.models.verification import (
+    COMPACT_RESULT_FIELDS,
+    LabelData,
+    VerificationResult,
+)
+from app.services import profiling_service
+from app.services.admission_service import (
+    AdmissionRejected,
+    TrafficClass,
+    admission_controller,
+    client_address,
+    find_api_client,
+)
+from app.services.audit_service import audit_store
+from app.services.ocr_config import TesseractProfile
+from app.services.ocr_service import extract_text_from_images, get_tesseract_profile
+from app.services.profiling_service import ProfileMode, profiled, stage
+from app.services.verification_service import (
+    combine_ocr_texts,
+    find_field_sources,
+    verify_label,
+)
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 # Maximum file size (5MB)
 MAX_FILE_SIZE = 5 * 1024 * 1024
+# Maximum number of images per submission (e.g. front, back and neck labels)
+MAX_IMAGES = 5
+# Seconds a streamed verification may run; timeout_middleware in main.py only
+# covers the time until the response starts, not a streamed body
+STREAM_TIMEOUT = 60.0
 
 
 class VerificationError(Exception):
-    def __init__(self, status_code: int, detail: str):
+    def __init__(
+        self, status_code: int, detail: str, headers: Optional[Dict[str, str]] = None
+    ):
         self.status_code = status_code
         self.detail = detail
+        self.headers = headers
 
 
 def get_image_info(image_data: bytes) -> Dict:
@@ -41,88 +80,586 @@ def get_image_info(image_data: bytes) -> Dict:
         return {}
 
 
-@router.post("/verify")
+async def read_image(image: UploadFile) -> bytes:
+    """
+    Validate an uploaded image's type and size and return its contents.
+    """
+    if image.content_type not in ["image/jpeg", "image/png"]:
+        raise VerificationError(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail="Invalid file type. Only JPEG and PNG images are allowed.",
+        )
+
+    contents = await image.read()
+
+    if len(contents) > MAX_FILE_SIZE:
+        raise VerificationError(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail="File size exceeds maximum limit of 5MB",
+        )
+
+    return contents
+
+
+def resolve_profile_mode(request: Request) -> Optional[str]:
+    """
+    Profile mode for this request: requested explicitly by an admin through the
+    X-Profile header ("inline" or "file"), or sampled at PROFILE_SAMPLE_RATE.
+    """
+    requested = request.headers.get("X-Profile")
+    if requested:
+        if requested not in ProfileMode.ALL:
+            raise VerificationError(
+                status_code=HTTP_400_BAD_REQUEST,
+                detail=f"Invalid X-Profile mode: {requested}",
+            )
+        token = request.headers.get("X-Admin-Token", "")
+        admin_token = profiling_service.PROFILE_ADMIN_TOKEN
+        if not admin_token or not hmac.compare_digest(token, admin_token):
+            raise VerificationError(
+                status_code=HTTP_403_FORBIDDEN,
+                detail="Profiling requires a valid admin token",
+            )
+        return requested
+
+    sample_rate = profiling_service.PROFILE_SAMPLE_RATE
+    if sample_rate > 0 and random.random() < sample_rate:
+        return ProfileMode.FILE
+    return None
+
+
+def resolve_client(request: Request) -> Tuple[str, str]:
+    """
+    Client ID and traffic class used for admission control. Callers with an
+    X-API-Key are identified by that key and get its class: interactive for
+    INTERACTIVE_API_KEYS, bulk for ADMISSION_API_KEYS. Everyone else is bulk and
+    identified by the address the trusted proxies saw (TRUSTED_PROXY_HOPS), so
+    request headers alone can't change a caller's class or identity.
+    """
+    api_key = request.headers.get("X-API-Key")
+    if api_key:
+        client = find_api_client(api_key)
+        if client is None:
+            raise VerificationError(
+                status_code=HTTP_401_UNAUTHORIZED, detail="Invalid API key"
+            )
+        client_id, traffic_class = client
+        return f"key:{client_id}", traffic_class
+
+    peer = request.client.host if request.client else "unknown"
+    address = client_address(peer, request.headers.get("X-Forwarded-For"))
+    return address, TrafficClass.BULK
+
+
+def parse_response_fields(fields: Optional[str]) -> Optional[Set[str]]:
+    """
+    Parse the comma-separated `fields` option into a set of result fields.
+    The "compact" preset expands to COMPACT_RESULT_FIELDS.
+    """
+    if not fields or not fields.strip():
+        return None
+
+    selected = set()
+    for name in (f.strip() for f in fields.split(",")):
+        if not name:
+            continue
+        if name == "compact":
+            selected |= COMPACT_RESULT_FIELDS
+        elif name in VerificationResult.model_fields:
+            selected.add(name)
+        else:
+            raise VerificationError(
+                status_code=HTTP_400_BAD_REQUEST,
+                detail=f"Unknown response field: {name}",
+            )
+    return selected or None
+
+
+def serialize_result(
+    result: VerificationResult, fields: Optional[Set[str]] = None
+) -> str:
+    """
+    Serialize the result with pydantic's native JSON encoder, skipping FastAPI's
+    response model revalidation, and keep only the requested fields.
+    """
+    return result.model_dump_json(
+        include=fields,
+        exclude={"profile"} if result.profile is None else None,
+    )
+
+
+def build_response(
+    result: VerificationResult, fields: Optional[Set[str]] = None
+) -> Response:
+    return Response(
+        content=serialize_result(result, fields),
+        media_type="application/json",
+    )
+
+
+def to_http_exception(e: Exception) -> HTTPException:
+    """
+    Map an error raised while verifying a submission to its HTTP response.
+    """
+    if isinstance(e, VerificationError):
+        logger.error(f"Verification error: {e.detail}")
+        return HTTPException(
+            status_code=e.status_code, detail=e.detail, headers=e.headers
+        )
+    if isinstance(e, ValueError):
+        logger.error(f"Validation error: {str(e)}")
+        return HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+    logger.error(f"Unexpected error: {str(e)}")
+    return HTTPException(
+        status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+        detail="Unexpected error processing image. Please try again.",
+    )
+
+
+@dataclass
+class Submission:
+    form_data: LabelData
+    contents: List[bytes]
+    images_info: List[Dict]
+    engine: TesseractProfile
+    fuzzy_match: bool
+    check_government_warning: bool
+    client_id: str
+    traffic_class: str
+
+
+async def prepare_submission(
+    request: Request,
+    image: Optional[UploadFile],
+    images: Optional[List[UploadFile]],
+    form_data: LabelData,
+    fuzzy_match: bool,
+    check_government_warning: bool,
+    tesseract_profile: Optional[str],
+) -> Submission:
+    """
+    Validate the caller, uploaded images and options before any OCR work starts.
+    """
+    client_id, traffic_class = resolve_client(request)
+
+    try:
+        engine = get_tesseract_profile(tesseract_profile)
+    except ValueError as e:
+        raise VerificationError(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
+
+    uploads = ([image] if image else []) + (images or [])
+    if not uploads:
+        raise VerificationError(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail="No image provided.",
+        )
+    if len(uploads) > MAX_IMAGES:
+        raise VerificationError(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail=f"Too many images. At most {MAX_IMAGES} are allowed.",
+        )
+
+    # Validate image files
+    with stage("read_images"):
+        contents = [await read_image(upload) for upload in uploads]
+        images_info = [get_image_info(data) for data in contents]
+    if not all(images_info):
+        raise VerificationError(
+            status_code=HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="Unable to process image. Ensure valid JPEG or PNG file.",
+        )
+
+    return Submission(
+        form_data=form_data,
+        contents=contents,
+        images_info=images_info,
+        engine=engine,
+        fuzzy_match=fuzzy_match,
+        check_government_warning=check_government_warning,
+        client_id=client_id,
+        traffic_class=traffic_class,
+    )
+
+
+async def run_submission(
+    submission: Submission,
+    on_pass: Optional[Callable[[int, int, str], None]] = None,
+    accepted: Optional[asyncio.Event] = None,
+) -> Tuple[VerificationResult, float]:
+    """
+    OCR and verify a validated submission and record it to the audit store.
+    `on_pass(image_index, pass_number, text)` is called from the OCR workers as
+    each Tesseract pass finishes. `accepted` is set once admission control has
+    accepted the request, before it waits for an OCR slot.
+    Returns the result and the admission queue wait.
+    """
+    form_data = submission.form_data
+    profile = profiling_service.get_profile()
+
+    def is_resolved(texts: Dict[int, str]) -> bool:
+        combined = combine_ocr_texts(texts)
+        if not combined:
+            return False
+        partial = verify_label(
+            form_data,
+            combined,
+            fuzzy_match=submission.fuzzy_match,
+            check_government_warning=submission.check_government_warning,
+        )
+        return not partial.mismatches
+
+    # Wait for an OCR slot, then extract text from images, stopping once
+    # every field is found
+    client_id, traffic_class = submission.client_id, submission.traffic_class
+    try:
+        async with admission_controller.admit(
+            client_id, traffic_class, accepted
+        ) as slot:
+            queue_wait = slot.queue_wait
+            if profile:
+                profile.record_stage("queue_wait", queue_wait)
+            if queue_wait:
+                logger.info(
+                    f"Queued {traffic_class} request from {client_id} "
+                    f"for {queue_wait * 1000:.0f} ms"
+                )
+            try:
+                with stage("ocr"):
+                    ocr_results = await extract_text_from_images(
+                        submission.contents,
+                        is_resolved,
+                        submission.engine,
+                        on_pass,
+                        # Keep the slot until OCR this request started has
+                        # stopped, even if the request is cancelled
+                        slot.hold_until,
+                    )
+            except Exception as e:
+                logger.error(f"OCR processing error: {str(e)}")
+                raise VerificationError(
+                    status_code=HTTP_422_UNPROCESSABLE_CONTENT,
+                    detail="Error processing image text. "
+                    "Ensure clear and oriented image.",
+                )
+    except AdmissionRejected as e:
+        raise VerificationError(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+
+    images_info = submission.images_info
+    ocr_texts = {index: r.text for index, r in ocr_results.items()}
+    for index, ocr_result in ocr_results.items():
+        images_info[index]["ocr_profile"] = ocr_result.profile
+        images_info[index]["tesseract_profile"] = submission.engine.name
+        images_info[index]["ocr_regions"] = ocr_result.regions
+        images_info[index]["ocr_pixels"] = ocr_result.ocr_pixels
+        images_info[index]["ocr_ms"] = round(ocr_result.ocr_ms, 1)
+        if ocr_result.quality:
+            images_info[index]["quality"] = ocr_result.quality
+
+    ocr_text = combine_ocr_texts(ocr_texts)
+    if not ocr_text:
+        raise VerificationError(
+            status_code=HTTP_422_UNPROCESSABLE_CONTENT,
+            detail="No text detected in image. Ensure clear and readable text.",
+        )
+
+    # Verify label data against the combined text of all images
+    try:
+        with stage("verify"):
+            result = profiled(
+                verify_label,
+                form_data,
+                ocr_text,
+                fuzzy_match=submission.fuzzy_match,
+                check_government_warning=submission.check_government_warning,
+            )
+            result.field_sources = profiled(
+                find_field_sources,
+                form_data,
+                ocr_texts,
+                result,
+                fuzzy_match=submission.fuzzy_match,
+                check_government_warning=submission.check_government_warning,
+            )
+    except ValueError as e:
+        raise VerificationError(
+            status_code=HTTP_422_UNPROCESSABLE_CONTENT, detail=str(e)
+        )
+
+    if len(images_info) == 1:
+        result.image_info = images_info[0]
+    else:
+        result.image_info = {
+            "images": images_info,
+            "ocr_skipped": [
+                index for index in range(len(images_info)) if index not in ocr_texts
+            ],
+        }
+
+    if audit_store is not None:
+        audit_store.record(
+            result,
+            brand_name=form_data.brand_name,
+            product_type=form_data.product_type,
+            image_digests=[
+                hashlib.sha256(data).hexdigest() for data in submission.contents
+            ],
+        )
+
+    return result, queue_wait
+
+
+@router.post("/verify", response_model=VerificationResult)
 async def verify_label_image(
-    image: UploadFile,
+    request: Request,
+    image: Optional[UploadFile] = None,
+    images: Optional[List[UploadFile]] = None,
     brand_name: str = Form(...),
     product_type: str = Form(...),
     net_contents: str = Form(...),
     alcohol_content: float = Form(...),
     fuzzy_match: bool = Form(False),
     check_government_warning: bool = Form(False),
-) -> VerificationResult:
+    fields: Optional[str] = Form(None),
+    tesseract_profile: Optional[str] = Form(None),
+) -> Response:
     """
-    Verify alcohol label image against provided form data.
+    Verify alcohol label image(s) against provided form data.
+
+    Send a single `image`, or several `images` (e.g. front, back and neck labels)
+    that are OCR'd in parallel and checked as one label.
+
+    `tesseract_profile` chooses the OCR model tier and engine options ("default",
+    "fast" or "best"); omitted, the deployment's TESSERACT_PROFILE is used.
+
+    `fields` optionally limits the response to a comma-separated list of
+    VerificationResult fields, or "compact" for the status fields only.
+
+    Admins can send `X-Profile: inline|file` with `X-Admin-Token` to capture a
+    stage breakdown and call profile, returned in `profile` or written to
+    PROFILE_DIR.
     """
     try:
-        # Validate image file
-        if image.content_type not in ["image/jpeg", "image/png"]:
-            raise VerificationError(
-                status_code=HTTP_400_BAD_REQUEST,
-                detail="Invalid file type. Only JPEG and PNG images are allowed.",
-            )
+        response_fields = parse_response_fields(fields)
+        profile_mode = resolve_profile_mode(request)
+        profile = (
+            profiling_service.start_profile(profile_mode) if profile_mode else None
+        )
+
+        submission = await prepare_submission(
+            request,
+            image,
+            images,
+            LabelData(
+                brand_name=brand_name,
+                product_type=product_type,
+                alcohol_content=alcohol_content,
+                net_contents=net_contents,
+            ),
+            fuzzy_match,
+            check_government_warning,
+            tesseract_profile,
+        )
+        result, queue_wait = await run_submission(submission)
 
-        contents = await image.read()
+        if profile and profile.mode == ProfileMode.INLINE:
+            result.profile = profile.report()
+            if response_fields:
+                response_fields.add("profile")
+        elif profile:
+            try:
+                # File and directory I/O; keep it off the event loop
+                profile_path = await run_in_threadpool(profile.write)
+                logger.info(f"Request profile written to {profile_path}")
+            except OSError as e:
+                logger.error(f"Error writing request profile: {str(e)}")
 
-        if len(contents) > MAX_FILE_SIZE:
-            raise VerificationError(
-                status_code=HTTP_400_BAD_REQUEST,
-                detail="File size exceeds maximum limit of 5MB",
-            )
+        response = build_response(result, response_fields)
+        response.headers["X-Queue-Wait-Ms"] = f"{queue_wait * 1000:.0f}"
+        if profile:
+            response.headers["X-Profile-Id"] = profile.request_id
+        return response
 
-        image_info = get_image_info(contents)
-        if not image_info:
-            raise VerificationError(
-                status_code=HTTP_422_UNPROCESSABLE_CONTENT,
-                detail="Unable to process image. Ensure valid JPEG or PNG file.",
-            )
+    except Exception as e:
+        raise to_http_exception(e)
+
+
+def format_event(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
 
+
+@router.post("/verify/stream")
+async def verify_label_image_stream(
+    request: Request,
+    image: Optional[UploadFile] = None,
+    images: Optional[List[UploadFile]] = None,
+    brand_name: str = Form(...),
+    product_type: str = Form(...),
+    net_contents: str = Form(...),
+    alcohol_content: float = Form(...),
+    fuzzy_match: bool = Form(False),
+    check_government_warning: bool = Form(False),
+    fields: Optional[str] = Form(None),
+    tesseract_profile: Optional[str] = Form(None),
+) -> StreamingResponse:
+    """
+    Streaming variant of /verify that sends server-sent events as stages finish:
+
+    - `accepted`: images passed validation and admission control; data is their
+      image info
+    - `ocr_pass`: a Tesseract pass finished; data has `image`, `pass` and `text`
+    - `field`: a field was decided; data has `field`, `matched`, `close_matches`
+      and `image`. Matches are sent as soon as one image's text read so far
+      contains them, with that image as the source; mismatches are only final
+      once all OCR is done.
+    - `result`: the final VerificationResult, limited by `fields`. Its
+      `field_sources` agree with the `field` events.
+    - `error`: verification failed or took longer than STREAM_TIMEOUT; data has
+      `status_code` and `detail`
+
+    Validation errors and admission rejections (429/503 with Retry-After) are
+    returned as regular HTTP errors before streaming.
+    """
+    try:
+        response_fields = parse_response_fields(fields)
         form_data = LabelData(
             brand_name=brand_name,
             product_type=product_type,
             alcohol_content=alcohol_content,
             net_contents=net_contents,
         )
+        submission = await prepare_submission(
+            request,
+            image,
+            images,
+            form_data,
+            fuzzy_match,
+            check_government_warning,
+            tesseract_profile,
+        )
+    except Exception as e:
+        raise to_http_exception(e)
+
+    loop = asyncio.get_running_loop()
+    passes: asyncio.Queue = asyncio.Queue()
 
-        # Extract text from image
+    def on_pass(index: int, pass_number: int, text: str) -> None:
+        # Called from OCR worker threads
+        loop.call_soon_threadsafe(passes.put_nowait, (index, pass_number, text))
+
+    # Start verifying now, and only start streaming once admission control has
+    # accepted the request, so rate limiting and shedding are plain HTTP errors
+    # with Retry-After as on /verify
+    accepted = asyncio.Event()
+    task = asyncio.create_task(run_submission(submission, on_pass, accepted))
+    task.add_done_callback(lambda _: passes.put_nowait(None))
+    deadline = loop.time() + STREAM_TIMEOUT
+    accepted_wait = asyncio.ensure_future(accepted.wait())
+    await asyncio.wait({task, accepted_wait}, return_when=asyncio.FIRST_COMPLETED)
+    accepted_wait.cancel()
+    if not accepted.is_set():
         try:
-            ocr_text = extract_text_from_image(contents)
-            if not ocr_text.strip():
-                raise VerificationError(
-                    status_code=HTTP_422_UNPROCESSABLE_CONTENT,
-                    detail="No text detected in image. Ensure clear and readable text.",
-                )
+            task.result()
         except Exception as e:
-            logger.error(f"OCR processing error: {str(e)}")
-            raise VerificationError(
-                status_code=HTTP_422_UNPROCESSABLE_CONTENT,
-                detail="Error processing image text. Ensure clear and oriented image.",
-            )
+            raise to_http_exception(e)
+
+    async def events() -> AsyncIterator[str]:
+        yield format_event("accepted", json.dumps(submission.images_info))
 
-        # Verify label data
+        pass_texts: Dict[int, Dict[int, str]] = {}
+        # Fields matched early, mapped to the image whose own text matched them
+        decided: Dict[str, int] = {}
         try:
-            result = verify_label(
-                form_data,
-                ocr_text,
-                fuzzy_match=fuzzy_match,
-                check_government_warning=check_government_warning,
-            )
-            result.image_info = image_info
-            return result
-        except ValueError as e:
-            raise VerificationError(
-                status_code=HTTP_422_UNPROCESSABLE_CONTENT, detail=str(e)
+            while True:
+                try:
+                    item = await asyncio.wait_for(passes.get(), deadline - loop.time())
+                except asyncio.TimeoutError:
+                    yield format_event(
+                        "error",
+                        json.dumps(
+                            {
+                                "status_code": HTTP_408_REQUEST_TIMEOUT,
+                                "detail": "Request timeout",
+                            }
+                        ),
+                    )
+                    return
+                if item is None:
+                    break
+                index, pass_number, text = item
+                yield format_event(
+                    "ocr_pass",
+                    json.dumps({"image": index, "pass": pass_number, "text": text}),
+                )
+
+                # Send fields that already match on this image's text read so far,
+                # the same per-image rule as find_field_sources
+                image_passes = pass_texts.setdefault(index, {})
+                image_passes[pass_number] = text
+                image_text = combine_ocr_texts(image_passes)
+                if not image_text:
+                    continue
+                partial = verify_label(
+                    form_data,
+                    image_text,
+                    fuzzy_match=fuzzy_match,
+                    check_government_warning=check_government_warning,
+                )
+                for field, matched in partial.matches.items():
+                    if matched and field not in decided:
+                        decided[field] = index
+                        yield format_event(
+                            "field",
+                            json.dumps(
+                                {
+                                    "field": field,
+                                    "matched": True,
+                                    "close_matches": [],
+                                    "image": index,
+                                }
+                            ),
+                        )
+
+            try:
+                result, _ = task.result()
+            except Exception as e:
+                error = to_http_exception(e)
+                yield format_event(
+                    "error",
+                    json.dumps(
+                        {"status_code": error.status_code, "detail": error.detail}
+                    ),
+                )
+                return
+
+            # Credit early matches to the image they were sent with
+            result.field_sources.update(
+                {f: i for f, i in decided.items() if result.matches.get(f)}
             )
+            for field, matched in result.matches.items():
+                if field not in decided:
+                    yield format_event(
+                        "field",
+                        json.dumps(
+                            {
+                                "field": field,
+                                "matched": matched,
+                                "close_matches": result.close_matches.get(field, []),
+                                "image": result.field_sources.get(field),
+                            }
+                        ),
+                    )
+            yield format_event("result", serialize_result(result, response_fields))
+        finally:
+            # The client disconnected before the result was ready
+            if not task.done():
+                task.cancel()
 
-    except VerificationError as e:
-        logger.error(f"Verification error: {e.detail}")
-        raise HTTPException(status_code=e.status_code, detail=e.detail)
-    except ValueError as e:
-        logger.error(f"Validation error: {str(e)}")
-        raise HTTPException(status_code=HTTP_400_BAD_REQUEST, detail=str(e))
-    except Exception as e:
-        logger.error(f"Unexpected error: {str(e)}")
-        raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Unexpected error processing image. Please try again.",
-        )
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
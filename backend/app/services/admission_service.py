@@ -0,0 +1,369 @@
+import asyncio
+import hmac
+import logging
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Number of requests allowed in the OCR stage at once
+ADMISSION_CONCURRENCY = int(
+    os.getenv("ADMISSION_CONCURRENCY", str(os.cpu_count() or 1))
+)
+# Proxies in front of the app that append the caller's address to
+# X-Forwarded-For; 0 = use the connecting peer's address
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+# Number of recent queue waits kept per class for reporting
+WAIT_SAMPLES = 1000
+# Token buckets tracked before idle, full buckets are pruned
+MAX_TRACKED_BUCKETS = 10000
+
+
+class TrafficClass:
+    INTERACTIVE = "interactive"
+    BULK = "bulk"
+
+    ALL = (INTERACTIVE, BULK)
+
+
+@dataclass(frozen=True)
+class ClassConfig:
+    # Share of OCR slots relative to other classes when both are queued
+    weight: float
+    # Waiting requests allowed before new ones in this class are shed
+    max_queue: int
+    # Sustained requests per second allowed per client
+    rate: float
+    # Requests a client may make in a burst above the sustained rate
+    burst: float
+
+
+CLASS_CONFIGS: Dict[str, ClassConfig] = {
+    TrafficClass.INTERACTIVE: ClassConfig(weight=4.0, max_queue=50, rate=1.0, burst=5),
+    TrafficClass.BULK: ClassConfig(weight=1.0, max_queue=20, rate=2.0, burst=20),
+}
+
+
+def parse_api_keys(value: str) -> Dict[str, str]:
+    """
+    Parse comma-separated client_id:key pairs into a key -> client ID map.
+    """
+    keys: Dict[str, str] = {}
+    for pair in value.split(","):
+        client_id, _, key = pair.strip().partition(":")
+        if client_id and key:
+            keys[key] = client_id
+    return keys
+
+
+# Keys for scripted callers as comma-separated client_id:key pairs; each key
+# gets its own rate limit regardless of the address it calls from
+ADMISSION_API_KEYS = parse_api_keys(os.getenv("ADMISSION_API_KEYS", ""))
+# Keys, in the same format, whose callers are admitted as interactive traffic
+INTERACTIVE_API_KEYS = parse_api_keys(os.getenv("INTERACTIVE_API_KEYS", ""))
+
+
+def find_api_client(api_key: str) -> Optional[Tuple[str, str]]:
+    """
+    Client ID and traffic class for an API key from INTERACTIVE_API_KEYS or
+    ADMISSION_API_KEYS, or None if it is unknown.
+    """
+    for keys, traffic_class in (
+        (INTERACTIVE_API_KEYS, TrafficClass.INTERACTIVE),
+        (ADMISSION_API_KEYS, TrafficClass.BULK),
+    ):
+        for key, client_id in keys.items():
+            if hmac.compare_digest(api_key, key):
+                return client_id, traffic_class
+    return None
+
+
+def client_address(
+    peer: str, forwarded_for: Optional[str], hops: Optional[int] = None
+) -> str:
+    """
+    The caller's address as seen by the outermost of `hops` (default:
+    TRUSTED_PROXY_HOPS) trusted proxies.
+    Each proxy appends the address it received the request from to
+    X-Forwarded-For, so only the last `hops` entries are trustworthy; anything
+    to their left was written by the caller.
+    """
+    if hops is None:
+        hops = TRUSTED_PROXY_HOPS
+    if hops <= 0 or not forwarded_for:
+        return peer
+    addresses = [a.strip() for a in forwarded_for.split(",") if a.strip()]
+    if not addresses:
+        return peer
+    return addresses[-min(hops, len(addresses))]
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> float:
+        """
+        Take a token; returns 0 on success, else seconds until one is available.
+        """
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    @property
+    def is_full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.burst
+
+
+@dataclass
+class ClassQueue:
+    config: ClassConfig
+    # Per-client FIFOs, served round-robin so one client can't monopolize a class
+    clients: "OrderedDict[str, Deque[asyncio.Future]]" = field(
+        default_factory=OrderedDict
+    )
+    size: int = 0
+    # Stride-scheduling pass value; the class with the lowest pass goes next
+    pass_value: float = 0.0
+    waits: Deque[float] = field(default_factory=lambda: deque(maxlen=WAIT_SAMPLES))
+    admitted: int = 0
+    shed: int = 0
+    throttled: int = 0
+
+
+class AdmissionSlot:
+    """
+    An OCR slot held by one request. hold_until() keeps the slot after the
+    request leaves admit() until the given executor futures finish, so OCR that
+    outlives its request (e.g. after a timeout) still counts toward concurrency.
+    """
+
+    def __init__(self, controller: "AdmissionController", queue_wait: float):
+        self.queue_wait = queue_wait
+        self._controller = controller
+        self._loop = asyncio.get_running_loop()
+        self._pending = 0
+        self._exited = False
+        self._released = False
+
+    def hold_until(self, futures: Iterable[Future]) -> None:
+        for future in futures:
+            self._pending += 1
+            # Done callbacks run in the worker thread
+            future.add_done_callback(
+                lambda _: self._loop.call_soon_threadsafe(self._finish_one)
+            )
+
+    def _finish_one(self) -> None:
+        self._pending -= 1
+        self._maybe_release()
+
+    def _exit(self) -> None:
+        self._exited = True
+        self._maybe_release()
+
+    def _maybe_release(self) -> None:
+        if self._exited and not self._pending and not self._released:
+            self._released = True
+            self._controller._release()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(pct * len(ordered)) - 1)]
+
+
+class AdmissionController:
+    """
+    Admission control for the OCR stage.
+    Each request holds one of `concurrency` slots while it runs OCR. When all
+    slots are busy, requests queue per class and per client. Classes are served
+    in proportion to their weights, and clients within a class round-robin.
+    Per-client token buckets limit request rates, and a full class queue sheds
+    new requests in that class only.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = ADMISSION_CONCURRENCY,
+        configs: Dict[str, ClassConfig] = CLASS_CONFIGS,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.in_flight = 0
+        self.queues = {name: ClassQueue(config) for name, config in configs.items()}
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        client_id: str,
+        traffic_class: str,
+        accepted: Optional[asyncio.Event] = None,
+    ):
+        """
+        Wait for an OCR slot; yields the AdmissionSlot, whose `queue_wait` is the
+        time spent queued, in seconds.
+        Raises AdmissionRejected when rate limited (429) or shed (503). Those
+        checks happen before any waiting; `accepted` is set once they pass.
+        """
+        queue = self.queues[traffic_class]
+        self._take_token(client_id, traffic_class, queue)
+
+        started = time.perf_counter()
+        waiter = None
+        if self.in_flight < self.concurrency and not self._queued():
+            self.in_flight += 1
+        else:
+            waiter = self._enqueue(client_id, queue)
+        if accepted is not None:
+            accepted.set()
+        if waiter is not None:
+            await self._wait(client_id, queue, waiter)
+        wait = time.perf_counter() - started
+        queue.waits.append(wait)
+        queue.admitted += 1
+
+        slot = AdmissionSlot(self, wait)
+        try:
+            yield slot
+        finally:
+            slot._exit()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        report: Dict[str, Dict[str, float]] = {}
+        for name, queue in self.queues.items():
+            waits_ms = [w * 1000 for w in queue.waits]
+            report[name] = {
+                "queued": queue.size,
+                "admitted": queue.admitted,
+                "shed": queue.shed,
+                "throttled": queue.throttled,
+                "wait_p50_ms": percentile(waits_ms, 0.5),
+                "wait_p95_ms": percentile(waits_ms, 0.95),
+                "wait_max_ms": max(waits_ms, default=0.0),
+            }
+        return report
+
+    def _take_token(self, client_id: str, traffic_class: str, queue: ClassQueue):
+        key = (traffic_class, client_id)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_BUCKETS:
+                self._prune_buckets()
+            bucket = TokenBucket(queue.config.rate, queue.config.burst)
+            self._buckets[key] = bucket
+
+        retry_after = bucket.try_take()
+        if retry_after:
+            queue.throttled += 1
+            raise AdmissionRejected(
+                status_code=429,
+                detail="Rate limit exceeded. Please retry later.",
+                retry_after=retry_after,
+            )
+
+    def _prune_buckets(self) -> None:
+        # Full buckets behave exactly like new ones, so dropping them is lossless
+        for key in [k for k, b in self._buckets.items() if b.is_full]:
+            del self._buckets[key]
+
+    def _queued(self) -> int:
+        return sum(queue.size for queue in self.queues.values())
+
+    def _enqueue(self, client_id: str, queue: ClassQueue) -> asyncio.Future:
+        if queue.size >= queue.config.max_queue:
+            queue.shed += 1
+            raise AdmissionRejected(
+                status_code=503,
+                detail="Server is busy. Please retry later.",
+                retry_after=1.0,
+            )
+
+        if queue.size == 0:
+            # A class returning from idle starts level with the queued classes
+            # rather than cashing in credit for the time it was idle
+            active = [q.pass_value for q in self.queues.values() if q.size]
+            queue.pass_value = max(queue.pass_value, min(active, default=0.0))
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.clients.setdefault(client_id, deque()).append(waiter)
+        queue.size += 1
+        return waiter
+
+    async def _wait(
+        self, client_id: str, queue: ClassQueue, waiter: asyncio.Future
+    ) -> None:
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled
+                self._release()
+            else:
+                self._remove_waiter(client_id, queue, waiter)
+            raise
+
+    def _remove_waiter(
+        self, client_id: str, queue: ClassQueue, waiter: asyncio.Future
+    ) -> None:
+        waiters = queue.clients.get(client_id)
+        if waiters and waiter in waiters:
+            waiters.remove(waiter)
+            queue.size -= 1
+            if not waiters:
+                del queue.clients[client_id]
+
+    def _release(self) -> None:
+        # Hand the slot straight to the next waiter, or free it
+        while True:
+            queue = min(
+                (q for q in self.queues.values() if q.size),
+                key=lambda q: q.pass_value,
+                default=None,
+            )
+            if queue is None:
+                self.in_flight -= 1
+                return
+
+            client_id, waiters = next(iter(queue.clients.items()))
+            waiter = waiters.popleft()
+            queue.size -= 1
+            if waiters:
+                queue.clients.move_to_end(client_id)
+            else:
+                del queue.clients[client_id]
+            if waiter.done():
+                # Cancelled while queued, before its task ran to dequeue itself
+                continue
+            queue.pass_value += 1 / queue.config.weight
+            waiter.set_result(None)
+            return
+
+
+admission_controller = AdmissionController()
@@ -0,0 +1,318 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Deque, List, Optional, Tuple
+
+from app.models.audit import AuditPage, AuditRecord
+from app.models.verification import VerificationResult
+
+logger = logging.getLogger(__name__)
+
+# SQLite database file; set AUDIT_ENABLED=false to keep no history
+AUDIT_DB_PATH = os.getenv("AUDIT_DB_PATH", "audit.db")
+AUDIT_ENABLED = os.getenv("AUDIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Seconds between background flushes of the write buffer
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+# Flush early once this many entries are buffered
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+# Entries buffered before the oldest are dropped (e.g. if the disk stalls)
+AUDIT_MAX_BUFFER = int(os.getenv("AUDIT_MAX_BUFFER", "10000"))
+# Shared secret required in X-Admin-Token to query history; unset disables it
+AUDIT_ADMIN_TOKEN = os.getenv("AUDIT_ADMIN_TOKEN")
+# Largest page the query endpoint returns
+AUDIT_MAX_PAGE_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS verifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    brand_name TEXT NOT NULL,
+    brand_name_norm TEXT NOT NULL,
+    product_type TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    result_json TEXT NOT NULL
+);
+-- Every filter's index ends in (created_at, id), the order pages are read in
+DROP INDEX IF EXISTS idx_verifications_brand;
+DROP INDEX IF EXISTS idx_verifications_success;
+CREATE INDEX IF NOT EXISTS idx_verifications_brand_time
+    ON verifications (brand_name_norm, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_verifications_created_at
+    ON verifications (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_verifications_success_time
+    ON verifications (success, created_at, id);
+
+CREATE TABLE IF NOT EXISTS verification_images (
+    verification_id INTEGER NOT NULL REFERENCES verifications (id),
+    image_index INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (verification_id, image_index)
+);
+CREATE INDEX IF NOT EXISTS idx_verification_images_digest
+    ON verification_images (digest, verification_id);
+"""
+
+
+def normalize_brand(brand_name: str) -> str:
+    return " ".join(brand_name.lower().split())
+
+
+def encode_cursor(created_at: float, record_id: int) -> str:
+    return f"{created_at!r}:{record_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    """
+    Parse a cursor from encode_cursor. Raises ValueError if it is malformed.
+    """
+    created_at, _, record_id = cursor.rpartition(":")
+    return float(created_at), int(record_id)
+
+
+def build_query(
+    brand_name: Optional[str] = None,
+    success: Optional[bool] = None,
+    image_digest: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Tuple[str, List[Any]]:
+    """
+    SQL and parameters for one page of history, newest first by (created_at, id).
+    Each filter's index ends in those columns, so time bounds and the cursor
+    narrow an index range that is already in page order.
+    Raises ValueError for a malformed cursor.
+    """
+    clauses: List[str] = []
+    params: List[Any] = []
+    if brand_name:
+        clauses.append("brand_name_norm = ?")
+        params.append(normalize_brand(brand_name))
+    if success is not None:
+        clauses.append("success = ?")
+        params.append(int(success))
+    if image_digest:
+        clauses.append(
+            "id IN (SELECT verification_id FROM verification_images WHERE digest = ?)"
+        )
+        params.append(image_digest.lower())
+    if since is not None:
+        clauses.append("created_at >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("created_at < ?")
+        params.append(until)
+    if cursor is not None:
+        clauses.append("(created_at, id) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = (
+        "SELECT id, created_at, brand_name, product_type, success, result_json"
+        f" FROM verifications {where} ORDER BY created_at DESC, id DESC LIMIT ?"
+    )
+    return sql, [*params, limit]
+
+
+@dataclass
+class AuditEntry:
+    created_at: float
+    brand_name: str
+    product_type: str
+    success: bool
+    image_digests: List[str]
+    result_json: str
+
+
+class AuditStore:
+    """
+    SQLite-backed verification history with write-behind batching.
+    record() only appends to an in-memory buffer; a background task flushes
+    the buffer in batches on a dedicated database thread.
+    """
+
+    def __init__(self, path: str = AUDIT_DB_PATH):
+        self.path = path
+        self._buffer: Deque[AuditEntry] = deque(maxlen=AUDIT_MAX_BUFFER)
+        self._dropped = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        # A single thread owns the connection, serializing reads and writes
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audit")
+
+    async def start(self) -> None:
+        await self._run(self._connect)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        await self._run(self._close)
+
+    def record(
+        self,
+        result: VerificationResult,
+        brand_name: str,
+        product_type: str,
+        image_digests: List[str],
+    ) -> None:
+        """
+        Queue a verification result for the next batch; never blocks on disk.
+        """
+        if len(self._buffer) == self._buffer.maxlen:
+            self._dropped += 1
+            logger.warning(f"Audit buffer full; dropped {self._dropped} entries")
+        self._buffer.append(
+            AuditEntry(
+                created_at=time.time(),
+                brand_name=brand_name,
+                product_type=product_type,
+                success=result.success,
+                image_digests=image_digests,
+                result_json=result.model_dump_json(exclude={"profile"}),
+            )
+        )
+        if len(self._buffer) >= AUDIT_BATCH_SIZE:
+            self._wakeup.set()
+
+    async def flush(self) -> int:
+        """
+        Write all buffered entries to the database.
+        """
+        written = 0
+        while self._buffer and self._conn is not None:
+            batch = [
+                self._buffer.popleft()
+                for _ in range(min(AUDIT_BATCH_SIZE, len(self._buffer)))
+            ]
+            try:
+                await self._run(self._write_batch, batch)
+            except sqlite3.Error as e:
+                logger.error(f"Error writing audit batch: {str(e)}")
+                # Put the batch back so it is retried on the next flush
+                self._buffer.extendleft(reversed(batch))
+                break
+            written += len(batch)
+        return written
+
+    async def query(
+        self,
+        brand_name: Optional[str] = None,
+        success: Optional[bool] = None,
+        image_digest: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+    ) -> AuditPage:
+        """
+        Page through history newest first. `cursor` is the `next_cursor` of the
+        previous page; pagination is keyset-based so every page is an index range
+        scan rather than an OFFSET over the table.
+        Raises ValueError for a malformed cursor.
+        """
+        limit = max(1, min(limit, AUDIT_MAX_PAGE_SIZE))
+        # Fetch one extra row to know whether another page exists
+        sql, params = build_query(
+            brand_name=brand_name,
+            success=success,
+            image_digest=image_digest,
+            since=since,
+            until=until,
+            limit=limit + 1,
+            cursor=cursor,
+        )
+        rows = await self._run(self._fetch, sql, tuple(params))
+
+        items = [
+            AuditRecord(
+                id=row[0],
+                created_at=row[1],
+                brand_name=row[2],
+                product_type=row[3],
+                success=bool(row[4]),
+                result=json.loads(row[5]),
+            )
+            for row in rows[:limit]
+        ]
+        next_cursor = (
+            encode_cursor(items[-1].created_at, items[-1].id)
+            if len(rows) > limit
+            else None
+        )
+        return AuditPage(items=items, next_cursor=next_cursor)
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(), timeout=AUDIT_FLUSH_INTERVAL
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def _run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    def _connect(self) -> None:
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _write_batch(self, batch: List[AuditEntry]) -> None:
+        assert self._conn is not None
+        with self._conn:
+            for entry in batch:
+                cursor = self._conn.execute(
+                    "INSERT INTO verifications (created_at, brand_name,"
+                    " brand_name_norm, product_type, success, result_json)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        entry.created_at,
+                        entry.brand_name,
+                        normalize_brand(entry.brand_name),
+                        entry.product_type,
+                        int(entry.success),
+                        entry.result_json,
+                    ),
+                )
+                self._conn.executemany(
+                    "INSERT INTO verification_images"
+                    " (verification_id, image_index, digest) VALUES (?, ?, ?)",
+                    [
+                        (cursor.lastrowid, index, digest)
+                        for index, digest in enumerate(entry.image_digests)
+                    ],
+                )
+
+    def _fetch(self, sql: str, params: Tuple[Any, ...]) -> List[Tuple[Any, ...]]:
+        if self._conn is None:
+            raise sqlite3.OperationalError("Audit store is not open")
+        return self._conn.execute(sql, params).fetchall()
+
+
+audit_store: Optional[AuditStore] = AuditStore() if AUDIT_ENABLED else None
@@ -0,0 +1,147 @@
+import os
+from dataclasses import dataclass
+from typing import ClassVar, Dict, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class OcrProfile:
+    """
+    Preprocessing and Tesseract passes applied to an image.
+    """
+
+    name: str
+    # Resize factor applied before OCR (1.0 = no upscale)
+    upscale: float
+    # Apply CLAHE to normalize lighting and contrast
+    clahe: bool
+    # Linear contrast boost (1.0 = none)
+    contrast_alpha: float
+    # Page segmentation modes run as separate passes, merged in order
+    psm_modes: Tuple[int, ...]
+
+
+class OcrProfiles:
+    # Clean digital renders: no enhancement, one sparse-text pass
+    FAST: ClassVar[OcrProfile] = OcrProfile(
+        name="fast",
+        upscale=1.0,
+        clahe=False,
+        contrast_alpha=1.0,
+        psm_modes=(11,),
+    )
+    # Degraded images (blur, low contrast, photos): 2x upscale, CLAHE and both
+    # sparse-text (--psm 11) and uniform-block (--psm 6) passes
+    FULL: ClassVar[OcrProfile] = OcrProfile(
+        name="full",
+        upscale=2.0,
+        clahe=True,
+        contrast_alpha=1.3,
+        psm_modes=(11, 6),
+    )
+
+    ALL: ClassVar[Dict[str, OcrProfile]] = {
+        FAST.name: FAST,
+        FULL.name: FULL,
+    }
+
+
+@dataclass(frozen=True)
+class TriageThresholds:
+    """
+    Image quality thresholds for choosing the fast OCR profile, measured on a
+    thumbnail. Clean renders in test-data score far above these (sharpness
+    ~3000-6500, contrast ~55-65); blurred ones fall below (sharpness < 150).
+    """
+
+    # Longest side of the thumbnail used for scoring
+    THUMBNAIL_SIZE: ClassVar[int] = 512
+    # Variance of the Laplacian; low values mean blur
+    MIN_SHARPNESS: ClassVar[float] = 1000.0
+    # Standard deviation of grayscale intensity
+    MIN_CONTRAST: ClassVar[float] = 45.0
+    # Fraction of edge pixels; too few means little text, too many means clutter
+    MIN_TEXT_DENSITY: ClassVar[float] = 0.03
+    MAX_TEXT_DENSITY: ClassVar[float] = 0.2
+    # Smaller images need the upscale for Tesseract to read the fine print
+    MIN_RESOLUTION: ClassVar[int] = 800
+
+
+@dataclass(frozen=True)
+class RegionThresholds:
+    """
+    Text-region detection settings. Regions are found on a downscaled copy of
+    the image, then cropped from the full-resolution image for OCR.
+    """
+
+    # Longest side of the image used for detection
+    DETECT_SIZE: ClassVar[int] = 1024
+    # Closing kernel (width, height) joining characters into lines and nearby
+    # lines into blocks, in detection pixels
+    CLOSE_KERNEL: ClassVar[Tuple[int, int]] = (25, 15)
+    # Smallest region kept, as a fraction of the detection image area
+    MIN_AREA: ClassVar[float] = 0.0005
+    MIN_HEIGHT: ClassVar[int] = 6
+    # Stroke components taller than this fraction of the image are borders or
+    # frames rather than glyphs
+    MAX_GLYPH_HEIGHT: ClassVar[float] = 0.2
+    # Margin kept around each region so Tesseract sees whole glyphs
+    PADDING: ClassVar[int] = 10
+    # OCR the whole frame instead when regions cover more than this fraction
+    # of it, or when there are more of them than this
+    MAX_COVERAGE: ClassVar[float] = 0.7
+    MAX_REGIONS: ClassVar[int] = 40
+
+
+@dataclass(frozen=True)
+class TesseractProfile:
+    """
+    Tesseract model tier and engine options, independent of preprocessing.
+    """
+
+    name: str
+    # tessdata directory holding the models; None = Tesseract's installed default
+    tessdata_dir: Optional[str]
+    # OCR engine mode: 1 = LSTM only, 3 = default (whatever the models support)
+    oem: int
+    # Page segmentation modes; None = use the preprocessing profile's passes
+    psm_modes: Optional[Tuple[int, ...]] = None
+    lang: str = "eng"
+    # Restrict recognized characters, e.g. to skip decorative glyphs
+    char_whitelist: Optional[str] = None
+    # Resolution hint for images without DPI metadata
+    dpi: Optional[int] = None
+
+
+class TesseractProfiles:
+    # tessdata_fast: integer-quantized LSTM models, quicker but less accurate
+    FAST_TESSDATA_DIR: ClassVar[str] = os.getenv(
+        "TESSDATA_FAST_DIR", "/usr/share/tessdata_fast"
+    )
+    # tessdata_best: full float LSTM models, most accurate and slowest
+    BEST_TESSDATA_DIR: ClassVar[str] = os.getenv(
+        "TESSDATA_BEST_DIR", "/usr/share/tessdata_best"
+    )
+
+    DEFAULT: ClassVar[TesseractProfile] = TesseractProfile(
+        name="default",
+        tessdata_dir=None,
+        oem=3,
+    )
+    FAST: ClassVar[TesseractProfile] = TesseractProfile(
+        name="fast",
+        tessdata_dir=FAST_TESSDATA_DIR,
+        oem=1,
+        dpi=300,
+    )
+    BEST: ClassVar[TesseractProfile] = TesseractProfile(
+        name="best",
+        tessdata_dir=BEST_TESSDATA_DIR,
+        oem=1,
+        dpi=300,
+    )
+
+    ALL: ClassVar[Dict[str, TesseractProfile]] = {
+        DEFAULT.name: DEFAULT,
+        FAST.name: FAST,
+        BEST.name: BEST,
+    }
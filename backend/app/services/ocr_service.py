@@ -1,72 +1,509 @@
+import asyncio
+import contextvars
 import io
 import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import cache, partial
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
 import pytesseract
 from PIL import Image
 
+from app.services.ocr_config import (
+    OcrProfile,
+    OcrProfiles,
+    RegionThresholds,
+    TesseractProfile,
+    TesseractProfiles,
+    TriageThresholds,
+)
+from app.services.profiling_service import profiled, stage
+
 logger = logging.getLogger(__name__)
 
+# Shared pool for OCR work. Tesseract runs as a subprocess, so threads give real
+# parallelism without blocking the event loop.
+OCR_EXECUTOR = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1, thread_name_prefix="ocr"
+)
+# Pool for OCRing the text regions of one image in parallel. Kept separate from
+# OCR_EXECUTOR so image workers never wait on tasks queued behind themselves.
+REGION_EXECUTOR = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1, thread_name_prefix="ocr-region"
+)
+# Images of one request OCR'd at once; the rest wait so OCR can stop early once
+# every field is found, even when the pool has a worker free for each image
+OCR_IMAGES_PER_REQUEST = max(1, int(os.getenv("OCR_IMAGES_PER_REQUEST", "2")))
+# OCR only detected text regions instead of the whole frame
+OCR_REGIONS = os.getenv("OCR_REGIONS", "false").lower() in ("1", "true", "yes")
+# Choose the OCR profile per image from a quality triage; off (default) = always
+# "full" until benchmarks show the fast profile keeps fine-print accuracy
+OCR_TRIAGE = os.getenv("OCR_TRIAGE", "false").lower() in ("1", "true", "yes")
+# Tesseract profile used when a request doesn't choose one
+TESSERACT_PROFILE = os.getenv("TESSERACT_PROFILE", TesseractProfiles.DEFAULT.name)
+
+
+@cache
+def find_missing_tessdata(profile: TesseractProfile) -> Optional[str]:
+    """
+    Path of the profile's model file if it is not installed, else None.
+    Profiles using Tesseract's default tessdata are not checked.
+    """
+    if profile.tessdata_dir is None:
+        return None
+    model = Path(profile.tessdata_dir) / f"{profile.lang}.traineddata"
+    return None if model.is_file() else str(model)
+
 
-def preprocess_image(image: Image.Image) -> Image.Image:
+def get_tesseract_profile(name: Optional[str] = None) -> TesseractProfile:
     """
-    Preprocess image for OCR: convert to grayscale, denoise, and enhance contrast.
+    Look up a Tesseract profile (default: TESSERACT_PROFILE) and check that its
+    models are installed. Raises ValueError otherwise.
+    """
+    name = name or TESSERACT_PROFILE
+    profile = TesseractProfiles.ALL.get(name)
+    if profile is None:
+        raise ValueError(
+            f"Unknown Tesseract profile: {name}. "
+            f"Choose from: {', '.join(TesseractProfiles.ALL)}"
+        )
+    missing = find_missing_tessdata(profile)
+    if missing:
+        raise ValueError(f"Tesseract profile '{name}' is not installed: {missing}")
+    return profile
+
+
+def build_tesseract_config(engine: TesseractProfile, psm: int) -> str:
+    config = f"--psm {psm} --oem {engine.oem}"
+    if engine.tessdata_dir:
+        # pytesseract splits the config with shlex, so quote the path
+        config += f' --tessdata-dir "{engine.tessdata_dir}"'
+    if engine.dpi:
+        config += f" --dpi {engine.dpi}"
+    if engine.char_whitelist:
+        config += f' -c "tessedit_char_whitelist={engine.char_whitelist}"'
+    return config
+
+
+def score_image_quality(image: Image.Image) -> Dict[str, float]:
+    """
+    Score sharpness, contrast and text density on a small grayscale thumbnail.
+    """
+    gray = np.array(image.convert("L"))
+    height, width = gray.shape
+    scale = TriageThresholds.THUMBNAIL_SIZE / max(height, width)
+    if scale < 1:
+        gray = cv2.resize(
+            gray,
+            (max(1, int(width * scale)), max(1, int(height * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+
+    edges = cv2.Canny(gray, 50, 150)
+    return {
+        "sharpness": float(cv2.Laplacian(gray, cv2.CV_64F).var()),
+        "contrast": float(gray.std()),
+        "text_density": float(np.count_nonzero(edges) / edges.size),
+        "resolution": float(max(height, width)),
+    }
+
+
+def choose_ocr_profile(quality: Dict[str, float]) -> OcrProfile:
+    """
+    Pick the fast profile for clean, high resolution images; full otherwise.
+    """
+    is_clean = (
+        quality["sharpness"] >= TriageThresholds.MIN_SHARPNESS
+        and quality["contrast"] >= TriageThresholds.MIN_CONTRAST
+        and TriageThresholds.MIN_TEXT_DENSITY
+        <= quality["text_density"]
+        <= TriageThresholds.MAX_TEXT_DENSITY
+        and quality["resolution"] >= TriageThresholds.MIN_RESOLUTION
+    )
+    return OcrProfiles.FAST if is_clean else OcrProfiles.FULL
+
+
+def preprocess_image(
+    image: Image.Image, profile: OcrProfile = OcrProfiles.FULL
+) -> Image.Image:
+    """
+    Preprocess image for OCR: convert to grayscale, then upscale and enhance
+    contrast as the profile requires.
     """
     # Convert to grayscale
     image = image.convert("L")
+    if profile.upscale == 1.0 and not profile.clahe and profile.contrast_alpha == 1.0:
+        return image
 
     np_image = np.array(image)
 
     # Slight denoise and upscale (rescaled_2x)
-    np_image = cv2.resize(np_image, None, fx=2.0, fy=2.0, interpolation=cv2.INTER_CUBIC)
+    if profile.upscale != 1.0:
+        np_image = cv2.resize(
+            np_image,
+            None,
+            fx=profile.upscale,
+            fy=profile.upscale,
+            interpolation=cv2.INTER_CUBIC,
+        )
 
     # Apply CLAHE to normalize lighting and contrast
-    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-    np_image = clahe.apply(np_image)
+    if profile.clahe:
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        np_image = clahe.apply(np_image)
 
     # Light contrast boost
-    np_image = cv2.convertScaleAbs(np_image, alpha=1.3, beta=0)
+    if profile.contrast_alpha != 1.0:
+        np_image = cv2.convertScaleAbs(np_image, alpha=profile.contrast_alpha, beta=0)
 
     return Image.fromarray(np_image)
 
 
-def extract_text_from_image(image_bytes: bytes) -> str:
-    try:
-        # Open image from bytes
-        image = Image.open(io.BytesIO(image_bytes))
+Box = Tuple[int, int, int, int]
+
+
+def merge_boxes(boxes: List[Box]) -> List[Box]:
+    """
+    Merge overlapping (left, top, right, bottom) boxes until none overlap.
+    """
+    merged = [list(box) for box in boxes]
+    changed = True
+    while changed:
+        changed = False
+        result: List[List[int]] = []
+        for box in merged:
+            for other in result:
+                if (
+                    box[0] < other[2]
+                    and other[0] < box[2]
+                    and box[1] < other[3]
+                    and other[1] < box[3]
+                ):
+                    other[:] = [
+                        min(box[0], other[0]),
+                        min(box[1], other[1]),
+                        max(box[2], other[2]),
+                        max(box[3], other[3]),
+                    ]
+                    changed = True
+                    break
+            else:
+                result.append(box)
+        merged = result
+    return [(left, top, right, bottom) for left, top, right, bottom in merged]
 
-        # Preprocess image
-        processed_image = preprocess_image(image)
 
-        # Run both OCR passes: --oem 3 = LSTM only
-        text_large = pytesseract.image_to_string(
-            processed_image,
-            # --psm 11 = Sparse text
-            config="--psm 11 --oem 3",
+def detect_text_regions(image: Image.Image) -> List[Box]:
+    """
+    Find candidate text blocks with a morphological gradient over a downscaled
+    grayscale copy. Returns (left, top, right, bottom) boxes in full-resolution
+    pixels, top to bottom.
+    """
+    gray = np.array(image.convert("L"))
+    height, width = gray.shape
+    scale = min(1.0, RegionThresholds.DETECT_SIZE / max(height, width))
+    if scale < 1:
+        gray = cv2.resize(
+            gray,
+            (max(1, int(width * scale)), max(1, int(height * scale))),
+            interpolation=cv2.INTER_AREA,
         )
-        text_small = pytesseract.image_to_string(
-            processed_image,
-            # --psm 6 = Assume a single uniform block of text
-            config="--psm 6 --oem 3",
+    small_height, small_width = gray.shape
+
+    # Glyph strokes have strong local gradients; flat background and glass don't
+    gradient = cv2.morphologyEx(
+        gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+    )
+    _, strokes = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+
+    # Drop stroke components taller than any glyph: printed borders and frames
+    # would otherwise join every line of text near them into one block
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(strokes, connectivity=8)
+    max_height = RegionThresholds.MAX_GLYPH_HEIGHT * small_height
+    tall = np.flatnonzero(stats[:, cv2.CC_STAT_HEIGHT] > max_height)
+    strokes[np.isin(labels, tall[tall > 0])] = 0
+
+    # Join characters into lines and nearby lines into blocks
+    blocks = cv2.morphologyEx(
+        strokes,
+        cv2.MORPH_CLOSE,
+        cv2.getStructuringElement(cv2.MORPH_RECT, RegionThresholds.CLOSE_KERNEL),
+    )
+    contours, _ = cv2.findContours(blocks, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    min_area = RegionThresholds.MIN_AREA * gray.size
+    pad = RegionThresholds.PADDING
+    boxes: List[Box] = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w * h < min_area or h < RegionThresholds.MIN_HEIGHT:
+            continue
+        boxes.append(
+            (
+                max(0, x - pad),
+                max(0, y - pad),
+                min(small_width, x + w + pad),
+                min(small_height, y + h + pad),
+            )
         )
 
-        text_large = text_large.strip().replace("\n", " ").replace("  ", " ")
-        text_small = text_small.strip().replace("\n", " ").replace("  ", " ")
+    return [
+        (
+            int(left / scale),
+            int(top / scale),
+            min(width, math.ceil(right / scale)),
+            min(height, math.ceil(bottom / scale)),
+        )
+        for left, top, right, bottom in join_rows(merge_boxes(boxes))
+    ]
 
-        # Combine results (favor larger text when overlapping)
-        if not text_large and not text_small:
-            raise ValueError("No text could be extracted from the image.")
 
-        if text_large and text_small:
-            combined = f"{text_large}\n{text_small}"
+def join_rows(boxes: List[Box]) -> List[Box]:
+    """
+    Join boxes on the same line (e.g. words of a large title that the closing
+    kernel didn't bridge) so each line is OCR'd once, left to right. Returns
+    boxes top to bottom.
+    """
+    rows: List[List[int]] = []
+    for left, top, right, bottom in sorted(boxes, key=lambda box: box[1]):
+        center = (top + bottom) / 2
+        row = next((row for row in rows if row[1] <= center <= row[3]), None)
+        if row is None:
+            rows.append([left, top, right, bottom])
         else:
-            combined = text_large or text_small
+            row[:] = [
+                min(left, row[0]),
+                min(top, row[1]),
+                max(right, row[2]),
+                max(bottom, row[3]),
+            ]
+    # Joining can make rows overlap the ones below them
+    return sorted(merge_boxes(rows), key=lambda box: box[1])
+
+
+def select_text_regions(image: Image.Image) -> Optional[List[Box]]:
+    """
+    Text regions worth cropping to, or None when the whole frame should be
+    OCR'd (no text found, or the regions would save little).
+    """
+    regions = detect_text_regions(image)
+    if not regions or len(regions) > RegionThresholds.MAX_REGIONS:
+        return None
+    covered = sum(
+        (right - left) * (bottom - top) for left, top, right, bottom in regions
+    )
+    if covered > RegionThresholds.MAX_COVERAGE * image.width * image.height:
+        return None
+    return regions
+
+
+def normalize_ocr_text(text: str) -> str:
+    return text.strip().replace("\n", " ").replace("  ", " ")
+
+
+def ocr_pass(
+    images: List[Image.Image],
+    engine: TesseractProfile,
+    psm: int,
+    cancel: Optional[threading.Event] = None,
+) -> str:
+    """
+    Run one Tesseract pass over each image, in parallel when there are several,
+    and join their text in order. Images not yet started when `cancel` is set
+    are skipped.
+    """
+    config = build_tesseract_config(engine, psm)
 
-        logger.debug(f"OCR combined result: {combined}")
+    def ocr(image: Image.Image) -> str:
+        if cancel is not None and cancel.is_set():
+            return ""
+        return pytesseract.image_to_string(image, lang=engine.lang, config=config)
+
+    if len(images) == 1:
+        texts = [ocr(images[0])]
+    else:
+        texts = list(REGION_EXECUTOR.map(ocr, images))
+    return " ".join(text for text in map(normalize_ocr_text, texts) if text)
+
+
+@dataclass
+class OcrResult:
+    text: str
+    # Name of the OcrProfile used, None if OCR failed before one was chosen
+    profile: Optional[str] = None
+    quality: Dict[str, float] = field(default_factory=dict)
+    # Name of the TesseractProfile used
+    engine: Optional[str] = None
+    # Number of text regions OCR'd, None if the whole frame was
+    regions: Optional[int] = None
+    # Pixels passed to Tesseract in each pass, after upscaling
+    ocr_pixels: int = 0
+    # Time spent in Tesseract across all passes
+    ocr_ms: float = 0.0
+
+
+def run_ocr(
+    image_bytes: bytes,
+    profile: Optional[OcrProfile] = None,
+    engine: TesseractProfile = TesseractProfiles.DEFAULT,
+    on_pass: Optional[Callable[[int, str], None]] = None,
+    use_regions: Optional[bool] = None,
+    cancel: Optional[threading.Event] = None,
+    triage: Optional[bool] = None,
+) -> OcrResult:
+    """
+    OCR an image with the given profile, or the cheapest adequate one chosen by
+    quality triage (`triage`, default: OCR_TRIAGE; otherwise "full"), using the
+    engine's model tier and options.
+    With `use_regions` (default: OCR_REGIONS), only detected text regions are
+    preprocessed and OCR'd, in parallel, and their text is joined in reading
+    order within each pass.
+    `on_pass(pass_number, text)` is called as each Tesseract pass finishes.
+    Once `cancel` is set, no further passes or regions are started and the text
+    read so far is returned.
+    Raises ValueError if no text could be extracted.
+    """
+    try:
+        # Open image from bytes
+        image = Image.open(io.BytesIO(image_bytes))
 
-        return combined.strip()
+        quality: Dict[str, float] = {}
+        if profile is None:
+            if OCR_TRIAGE if triage is None else triage:
+                with stage("triage"):
+                    quality = score_image_quality(image)
+                profile = choose_ocr_profile(quality)
+            else:
+                profile = OcrProfiles.FULL
+
+        regions = None
+        if OCR_REGIONS if use_regions is None else use_regions:
+            with stage("regions"):
+                regions = select_text_regions(image)
+        crops = [image.crop(box) for box in regions] if regions else [image]
+
+        # Preprocess image, or only its text regions
+        with stage("preprocess"):
+            processed_images = [preprocess_image(crop, profile) for crop in crops]
+
+        # Run each OCR pass
+        # --psm 11 = Sparse text, --psm 6 = Assume a single uniform block of text
+        psm_modes = engine.psm_modes or profile.psm_modes
+        passes = []
+        started = time.perf_counter()
+        for pass_number, psm in enumerate(psm_modes):
+            if cancel is not None and cancel.is_set():
+                break
+            with stage("tesseract"):
+                text = ocr_pass(processed_images, engine, psm, cancel)
+            passes.append(text)
+            if on_pass:
+                on_pass(pass_number, text)
+        ocr_ms = (time.perf_counter() - started) * 1000
+
+        # Combine results in pass order (sparse/larger text first)
+        combined = "\n".join(text for text in passes if text)
+        if not combined and not (cancel is not None and cancel.is_set()):
+            raise ValueError("No text could be extracted from the image.")
+
+        logger.debug(f"OCR combined result ({profile.name}): {combined}")
+
+        return OcrResult(
+            text=combined.strip(),
+            profile=profile.name,
+            quality=quality,
+            engine=engine.name,
+            regions=len(regions) if regions else None,
+            ocr_pixels=sum(img.width * img.height for img in processed_images),
+            ocr_ms=ocr_ms,
+        )
 
     except Exception as e:
         logger.error(f"Error during OCR processing: {str(e)}")
         raise ValueError(f"Failed to process image: {str(e)}")
+
+
+def extract_text_from_image(image_bytes: bytes) -> str:
+    return run_ocr(image_bytes).text
+
+
+async def extract_text_from_images(
+    images: List[bytes],
+    is_resolved: Callable[[Dict[int, str]], bool],
+    engine: TesseractProfile = TesseractProfiles.DEFAULT,
+    on_pass: Optional[Callable[[int, int, str], None]] = None,
+    hold: Optional[Callable[[List[Future]], None]] = None,
+) -> Dict[int, OcrResult]:
+    """
+    OCR several images in parallel on OCR_EXECUTOR, at most
+    OCR_IMAGES_PER_REQUEST at a time.
+    `on_pass(image_index, pass_number, text)` is called from the worker threads
+    as each Tesseract pass finishes.
+    After each image finishes, `is_resolved` is called with the texts so far; once
+    it returns True, images not started yet are skipped and running ones stop
+    before their next pass. `hold` is called with any OCR still running when this
+    returns or is cancelled.
+    Returns results keyed by image index. Images that fail OCR have empty text
+    and images that were skipped or stopped are absent.
+    """
+    cancel = threading.Event()
+    queued = deque(range(len(images)))
+    running: Dict[asyncio.Future, int] = {}
+    submitted: List[Future] = []
+
+    def submit(index: int) -> asyncio.Future:
+        # Each worker runs in a copy of the request context so an active request
+        # profile follows the OCR work onto the pool
+        submitted.append(
+            OCR_EXECUTOR.submit(
+                contextvars.copy_context().run,
+                profiled,
+                run_ocr,
+                images[index],
+                None,
+                engine,
+                partial(on_pass, index) if on_pass else None,
+                None,
+                cancel,
+            )
+        )
+        return asyncio.wrap_future(submitted[-1])
+
+    results: Dict[int, OcrResult] = {}
+    try:
+        while queued or running:
+            while queued and len(running) < OCR_IMAGES_PER_REQUEST:
+                index = queued.popleft()
+                running[submit(index)] = index
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                try:
+                    results[index] = future.result()
+                except ValueError as e:
+                    logger.warning(f"OCR failed for image {index}: {str(e)}")
+                    results[index] = OcrResult(text="")
+            texts = {index: result.text for index, result in results.items()}
+            if (queued or running) and is_resolved(texts):
+                logger.info(
+                    f"All fields resolved; skipping {len(queued) + len(running)} "
+                    "image(s)"
+                )
+                break
+    finally:
+        # Stop OCR still running for this request at its next pass
+        cancel.set()
+        unfinished = [future for future in submitted if not future.done()]
+        if hold and unfinished:
+            hold(unfinished)
+
+    return results
@@ -0,0 +1,165 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Shared secret required in X-Admin-Token to request a profile; unset disables it
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")
+# Fraction of requests (0.0-1.0) profiled and written to PROFILE_DIR
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+# Number of profiles kept in PROFILE_DIR before the oldest are removed
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "100"))
+# Number of functions included in the inline call profile
+PROFILE_TOP_FUNCTIONS = 30
+
+
+class ProfileMode:
+    INLINE = "inline"
+    FILE = "file"
+
+    ALL = (INLINE, FILE)
+
+
+class RequestProfile:
+    """
+    Stage timings and Python call profiles collected for a single request.
+    Safe to record into from the OCR worker threads.
+    """
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.request_id = uuid.uuid4().hex[:12]
+        self.started = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    def record_stage(self, name: str, seconds: float) -> None:
+        with self._lock:
+            stage_times = self.stages.setdefault(name, {"total_ms": 0.0, "count": 0})
+            stage_times["total_ms"] += seconds * 1000
+            stage_times["count"] += 1
+
+    def call(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run fn under cProfile in the current thread.
+        """
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active (e.g. a concurrent profiled
+            # request on Python 3.12+); keep the stage timings only
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._profiles.append(profiler)
+
+    def _stats(self, stream: Optional[io.StringIO] = None) -> Optional[pstats.Stats]:
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0], stream=stream)
+        for profiler in profiles[1:]:
+            stats.add(profiler)
+        return stats.sort_stats(pstats.SortKey.CUMULATIVE)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "total_ms": (time.perf_counter() - self.started) * 1000,
+            "stages": self.stages,
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Stage breakdown plus the top functions by cumulative time.
+        """
+        stream = io.StringIO()
+        stats = self._stats(stream)
+        if stats:
+            stats.print_stats(PROFILE_TOP_FUNCTIONS)
+        return {**self.summary(), "call_profile": stream.getvalue()}
+
+    def write(self, directory: Path = PROFILE_DIR) -> Path:
+        """
+        Write the stage breakdown (.json) and pstats dump (.prof) to directory,
+        removing the oldest profiles beyond PROFILE_MAX_FILES.
+        """
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}_{self.request_id}"
+        summary_path = directory / f"{name}.json"
+        with open(summary_path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        stats = self._stats()
+        if stats:
+            stats.dump_stats(directory / f"{name}.prof")
+
+        rotate_profiles(directory)
+        return summary_path
+
+
+def rotate_profiles(directory: Path, max_files: int = PROFILE_MAX_FILES) -> None:
+    summaries = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for summary_path in summaries[: max(0, len(summaries) - max_files)]:
+        summary_path.unlink(missing_ok=True)
+        summary_path.with_suffix(".prof").unlink(missing_ok=True)
+
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar(
+    "current_profile", default=None
+)
+
+
+def start_profile(mode: str) -> RequestProfile:
+    profile = RequestProfile(mode)
+    _current_profile.set(profile)
+    return profile
+
+
+def get_profile() -> Optional[RequestProfile]:
+    return _current_profile.get()
+
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a block as a named stage of the active request profile, if any.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.record_stage(name, time.perf_counter() - start)
+
+
+def profiled(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Call fn, under cProfile when a request profile is active.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        return fn(*args, **kwargs)
+    return profile.call(fn, *args, **kwargs)
@@ -1,7 +1,7 @@
 import difflib
 import logging
 import re
-from typing import List, Optional, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
 from app.models.verification import LabelData, VerificationResult
 from app.services.verification_config import (
@@ -326,3 +326,46 @@ def verify_label(
         expected_values=expected_values,
         image_info=None,
     )
+
+
+def combine_ocr_texts(ocr_texts: Dict[int, str]) -> str:
+    """
+    Join per-image OCR texts in submission order into one token set.
+    """
+    return "\n".join(
+        ocr_texts[index] for index in sorted(ocr_texts) if ocr_texts[index].strip()
+    )
+
+
+def find_field_sources(
+    form_data: LabelData,
+    ocr_texts: Dict[int, str],
+    result: VerificationResult,
+    fuzzy_match: bool = False,
+    check_government_warning: bool = False,
+) -> Dict[str, int]:
+    """
+    Map each matched field in `result` to the first image whose own OCR text
+    matches it. Fields that only match across images have no source.
+    """
+    matched = [field for field, success in result.matches.items() if success]
+    indices = [index for index in sorted(ocr_texts) if ocr_texts[index].strip()]
+
+    # A single image is the source of every match; skip re-verifying it
+    if len(indices) == 1:
+        return dict.fromkeys(matched, indices[0])
+
+    sources: Dict[str, int] = {}
+    for index in indices:
+        if len(sources) == len(matched):
+            break
+        image_result = verify_label(
+            form_data,
+            ocr_texts[index],
+            fuzzy_match=fuzzy_match,
+            check_government_warning=check_government_warning,
+        )
+        for field in matched:
+            if image_result.matches.get(field):
+                sources.setdefault(field, index)
+    return sources
@@ -0,0 +1,284 @@
+"""
+OCR Benchmark
+
+Runs the OCR pipeline over labelled test images (from test-data/output, or
+test-data/augmented for larger corpora) and reports latency and verification
+accuracy for each mode:
+
+- triage: quality triage picks the cheapest adequate OCR profile per image
+- full:   every image goes through the full preprocessing and both passes
+
+Each mode runs once per Tesseract profile (model tier and engine options), and
+the summary includes the latency triage saves over full and any accuracy cost.
+With --regions, each mode also runs with text-region detection, OCRing only the
+detected text blocks, and the summary compares pixels OCR'd, OCR time and
+accuracy against the whole frame. It also checks the two read the same text:
+token recall is the share of the whole frame's tokens also found in the region
+text, and Jaccard is the overlap of their token sets.
+
+Usage:
+    python benchmark_ocr.py --labels ../test-data/output
+    python benchmark_ocr.py --tesseract-profiles default,fast,best
+    python benchmark_ocr.py --regions
+    python benchmark_ocr.py --labels ../test-data/augmented --limit 500 --json out.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.models.verification import LabelData
+from app.services.ocr_config import OcrProfile, OcrProfiles, TesseractProfile
+from app.services.ocr_service import OcrResult, get_tesseract_profile, run_ocr
+from app.services.verification_service import normalize_text, verify_label
+
+CHECKED_FIELDS = ("brand_name", "product_type", "alcohol_content", "net_contents")
+
+
+def load_labels(labels_dir: Path, limit: Optional[int]) -> List[Dict[str, Any]]:
+    labels = []
+    for metadata_path in sorted(labels_dir.glob("*.json")):
+        image_path = metadata_path.with_suffix(".png")
+        if not image_path.exists():
+            continue
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        labels.append({**metadata, "image_bytes": image_path.read_bytes()})
+        if limit and len(labels) >= limit:
+            break
+    return labels
+
+
+def expected_matches(label: Dict[str, Any]) -> Dict[str, bool]:
+    """
+    A field should match when it is printed on the label (expected_ocr is set)
+    and agrees with what the form submitted.
+    """
+    expected = label["expected_ocr"]
+    form = label["form_submission"]
+    return {
+        field: expected.get(field) is not None
+        and same_value(field, expected[field], form[field])
+        for field in CHECKED_FIELDS
+        if form.get(field) is not None
+    }
+
+
+def same_value(field: str, printed: Any, submitted: Any) -> bool:
+    """
+    Compare a printed and a submitted value the way verify_label reads them:
+    alcohol content as a number (40 and 40.0 agree), text ignoring case and
+    spacing.
+    """
+    if field == "alcohol_content":
+        return float(printed) == float(submitted)
+    return normalize_text(str(printed)) == normalize_text(str(submitted))
+
+
+def benchmark_label(
+    label: Dict[str, Any],
+    profile: Optional[OcrProfile],
+    engine: TesseractProfile,
+    regions: bool = False,
+) -> Dict[str, Any]:
+    form = label["form_submission"]
+    started = time.perf_counter()
+    try:
+        ocr = run_ocr(
+            label["image_bytes"], profile, engine, use_regions=regions, triage=True
+        )
+    except ValueError:
+        ocr = OcrResult(text="", profile=profile.name if profile else None)
+    text = ocr.text
+    latency = time.perf_counter() - started
+
+    expected = expected_matches(label)
+    matches: Dict[str, bool] = {}
+    if text:
+        result = verify_label(
+            LabelData(
+                brand_name=form["brand_name"],
+                product_type=form["product_type"],
+                alcohol_content=form["alcohol_content"] or 0,
+                net_contents=form.get("net_contents"),
+            ),
+            text,
+        )
+        matches = result.matches
+
+    correct = sum(matches.get(field, False) == want for field, want in expected.items())
+    return {
+        "test_id": label["test_id"],
+        "profile": ocr.profile,
+        "regions": ocr.regions,
+        "latency_ms": latency * 1000,
+        "ocr_ms": ocr.ocr_ms,
+        "ocr_pixels": ocr.ocr_pixels,
+        "fields": len(expected),
+        "correct_fields": correct,
+        "text": text,
+    }
+
+
+def token_overlap(reference: str, candidate: str) -> Dict[str, float]:
+    """
+    Compare the token sets of two OCR texts: recall of the reference's tokens in
+    the candidate, and Jaccard similarity. Two empty texts agree fully.
+    """
+    expected = set(normalize_text(reference).split())
+    found = set(normalize_text(candidate).split())
+    union = expected | found
+    if not union:
+        return {"recall": 1.0, "jaccard": 1.0}
+    shared = len(expected & found)
+    return {
+        "recall": shared / len(expected) if expected else 0.0,
+        "jaccard": shared / len(union),
+    }
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = sorted(run["latency_ms"] for run in runs)
+    fields = sum(run["fields"] for run in runs)
+    profiles: Dict[str, int] = {}
+    for run in runs:
+        profiles[str(run["profile"])] = profiles.get(str(run["profile"]), 0) + 1
+    return {
+        "labels": len(runs),
+        "total_ms": sum(latencies),
+        "mean_ms": statistics.fmean(latencies),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "mean_ocr_ms": statistics.fmean(run["ocr_ms"] for run in runs),
+        "mean_ocr_pixels": statistics.fmean(run["ocr_pixels"] for run in runs),
+        "field_accuracy": (
+            sum(run["correct_fields"] for run in runs) / fields if fields else 0.0
+        ),
+        "label_accuracy": sum(run["correct_fields"] == run["fields"] for run in runs)
+        / len(runs),
+        "profiles": profiles,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR latency and accuracy")
+    parser.add_argument(
+        "--labels",
+        type=Path,
+        default=Path("../test-data/output"),
+        help="Directory of label images and their JSON metadata",
+    )
+    parser.add_argument(
+        "--limit", type=int, default=None, help="Benchmark at most this many labels"
+    )
+    parser.add_argument(
+        "--tesseract-profiles",
+        type=str,
+        default="default",
+        help="Comma-separated Tesseract profiles to benchmark (default, fast, best)",
+    )
+    parser.add_argument(
+        "--regions",
+        action="store_true",
+        help="Also run each mode OCRing only detected text regions",
+    )
+    parser.add_argument(
+        "--json", type=Path, default=None, help="Write per-label results to a file"
+    )
+    args = parser.parse_args()
+
+    labels = load_labels(args.labels, args.limit)
+    if not labels:
+        print(f"No labels found in {args.labels}", file=sys.stderr)
+        return 1
+
+    try:
+        engines = [
+            get_tesseract_profile(name.strip())
+            for name in args.tesseract_profiles.split(",")
+            if name.strip()
+        ]
+    except ValueError as e:
+        parser.error(str(e))
+
+    modes: Dict[str, Optional[OcrProfile]] = {
+        "triage": None,
+        "full": OcrProfiles.FULL,
+    }
+    region_options = [False, True] if args.regions else [False]
+    runs = {
+        f"{engine.name}/{mode}{'+regions' if regions else ''}": [
+            benchmark_label(label, profile, engine, regions) for label in labels
+        ]
+        for engine in engines
+        for mode, profile in modes.items()
+        for regions in region_options
+    }
+    summaries = {mode: summarize(mode_runs) for mode, mode_runs in runs.items()}
+
+    print(f"Benchmarked {len(labels)} label(s) from {args.labels}\n")
+    print(
+        f"{'mode':<24}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'ocr ms':>10}"
+        f"{'Mpixels':>10}{'field acc':>12}{'label acc':>12}  profiles"
+    )
+    for mode, summary in summaries.items():
+        print(
+            f"{mode:<24}{summary['mean_ms']:>10.0f}{summary['p50_ms']:>10.0f}"
+            f"{summary['p95_ms']:>10.0f}{summary['mean_ocr_ms']:>10.0f}"
+            f"{summary['mean_ocr_pixels'] / 1e6:>10.2f}"
+            f"{summary['field_accuracy']:>12.1%}"
+            f"{summary['label_accuracy']:>12.1%}  {summary['profiles']}"
+        )
+
+    print()
+    for engine in engines:
+        triage = summaries[f"{engine.name}/triage"]
+        full = summaries[f"{engine.name}/full"]
+        saved = 1 - triage["total_ms"] / full["total_ms"] if full["total_ms"] else 0.0
+        accuracy_cost = full["field_accuracy"] - triage["field_accuracy"]
+        print(
+            f"{engine.name}: triage latency saved vs full: {saved:.1%}, "
+            f"field accuracy cost: {accuracy_cost:+.1%}"
+        )
+        if not args.regions:
+            continue
+        for mode in modes:
+            whole = summaries[f"{engine.name}/{mode}"]
+            cropped = summaries[f"{engine.name}/{mode}+regions"]
+            pixels_saved, time_saved = (
+                1 - cropped[key] / whole[key] if whole[key] else 0.0
+                for key in ("mean_ocr_pixels", "mean_ocr_ms")
+            )
+            accuracy_cost = whole["field_accuracy"] - cropped["field_accuracy"]
+            overlaps = [
+                token_overlap(whole_run["text"], region_run["text"])
+                for whole_run, region_run in zip(
+                    runs[f"{engine.name}/{mode}"],
+                    runs[f"{engine.name}/{mode}+regions"],
+                )
+            ]
+            cropped["token_recall"], cropped["token_jaccard"] = (
+                statistics.fmean(overlap[key] for overlap in overlaps)
+                for key in ("recall", "jaccard")
+            )
+            print(
+                f"{engine.name}/{mode}: regions pixels saved: {pixels_saved:.1%}, "
+                f"OCR time saved: {time_saved:.1%}, "
+                f"field accuracy cost: {accuracy_cost:+.1%}, "
+                f"token recall: {cropped['token_recall']:.1%}, "
+                f"token Jaccard: {cropped['token_jaccard']:.1%}"
+            )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"summary": summaries, "runs": runs}, f, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
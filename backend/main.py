@@ -1,20 +1,41 @@
 import asyncio
 import logging
+from contextlib import asynccontextmanager
 
 import uvicorn
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 from starlette.status import HTTP_408_REQUEST_TIMEOUT, HTTP_500_INTERNAL_SERVER_ERROR
 
-from app.routers import health, verification
+from app.routers import audit, health, verification
+from app.services.audit_service import audit_store
+from app.services.ocr_service import get_tesseract_profile
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 
-app = FastAPI(title="TTB Label Verification System API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fail fast if the deployment's Tesseract profile has no installed models
+    try:
+        get_tesseract_profile()
+    except ValueError as e:
+        raise RuntimeError(f"Invalid OCR configuration: {str(e)}")
+
+    # Start the audit store's background flush; flush what's left on shutdown
+    if audit_store is not None:
+        await audit_store.start()
+    yield
+    if audit_store is not None:
+        await audit_store.stop()
+
+
+app = FastAPI(title="TTB Label Verification System API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -31,6 +52,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger responses for clients that send Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 
 # Add timeout middleware
 @app.middleware("http")
@@ -46,6 +70,7 @@ async def timeout_middleware(request: Request, call_next):
 # Include routers
 app.include_router(health.router, prefix="/api", tags=["health"])
 app.include_router(verification.router, prefix="/api", tags=["verification"])
+app.include_router(audit.router, prefix="/api", tags=["audit"])
 
 
 # Global exception handler
@@ -0,0 +1,112 @@
+import asyncio
+from concurrent.futures import Future
+
+import pytest
+
+from app.services.admission_service import (
+    AdmissionController,
+    AdmissionRejected,
+    ClassConfig,
+    TrafficClass,
+)
+
+
+def test_release_skips_waiter_cancelled_before_it_dequeues():
+    async def scenario():
+        controller = AdmissionController(concurrency=1)
+        holding = asyncio.Event()
+        go = asyncio.Event()
+        queued = None
+
+        async def hold():
+            async with controller.admit("holder", TrafficClass.BULK):
+                holding.set()
+                await go.wait()
+                # Cancel the queued request and release in the same tick, before
+                # its task runs to remove its waiter
+                queued.cancel()
+
+        async def wait_in_queue():
+            async with controller.admit("waiter", TrafficClass.BULK):
+                pass
+
+        holder = asyncio.create_task(hold())
+        await holding.wait()
+        queued = asyncio.create_task(wait_in_queue())
+        await asyncio.sleep(0)
+        assert controller.queues[TrafficClass.BULK].size == 1
+
+        go.set()
+        await holder
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+        assert controller.in_flight == 0
+        assert controller.queues[TrafficClass.BULK].size == 0
+        # The slot is still usable
+        async with controller.admit("next", TrafficClass.BULK):
+            assert controller.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_slot_held_until_running_ocr_finishes():
+    async def scenario():
+        controller = AdmissionController(concurrency=1)
+        ocr = Future()
+
+        async with controller.admit("client", TrafficClass.BULK) as slot:
+            slot.hold_until([ocr])
+        # The request has left admit() but its OCR is still running
+        assert controller.in_flight == 1
+
+        ocr.set_result(None)
+        await asyncio.sleep(0)
+        assert controller.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_accepted_is_set_before_queueing_and_not_when_shed():
+    async def scenario():
+        controller = AdmissionController(
+            concurrency=1,
+            configs={
+                TrafficClass.BULK: ClassConfig(
+                    weight=1.0, max_queue=1, rate=100.0, burst=100
+                )
+            },
+        )
+        queued_accepted = asyncio.Event()
+        shed_accepted = asyncio.Event()
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.admit("holder", TrafficClass.BULK):
+                await release.wait()
+
+        async def wait_in_queue():
+            async with controller.admit(
+                "waiter", TrafficClass.BULK, queued_accepted
+            ) as slot:
+                return slot.queue_wait
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(wait_in_queue())
+        await asyncio.sleep(0)
+        # Accepted while still waiting for the slot
+        assert queued_accepted.is_set()
+        assert not queued.done()
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit("late", TrafficClass.BULK, shed_accepted):
+                pass
+        assert rejected.value.status_code == 503
+        assert not shed_accepted.is_set()
+
+        release.set()
+        await holder
+        assert await queued > 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,118 @@
+import asyncio
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.verification import VerificationResult
+from app.services import audit_service
+from app.services.audit_service import SCHEMA, AuditStore, build_query
+
+# Two records share each timestamp, so paging has to break ties on id
+TIMESTAMPS = [1000.0 + i // 2 for i in range(20)]
+
+
+def make_result(success):
+    return VerificationResult(
+        success=success,
+        matches={},
+        mismatches=[],
+        raw_ocr_text="",
+        message="",
+    )
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    clock = iter(TIMESTAMPS)
+    monkeypatch.setattr(
+        audit_service, "time", SimpleNamespace(time=lambda: next(clock))
+    )
+    store = AuditStore(str(tmp_path / "audit.db"))
+    asyncio.run(store._run(store._connect))
+    for i in range(len(TIMESTAMPS)):
+        store.record(
+            make_result(i % 2 == 0),
+            brand_name="Old Tom" if i % 4 < 2 else "Fancy Vodka",
+            product_type="Whiskey",
+            image_digests=[f"digest-{i % 5}"],
+        )
+    asyncio.run(store.flush())
+    yield store
+    asyncio.run(store._run(store._close))
+
+
+def read_all(store, limit, **filters):
+    async def pages():
+        ids, cursor = [], None
+        while True:
+            page = await store.query(limit=limit, cursor=cursor, **filters)
+            assert len(page.items) <= limit
+            ids.extend(item.id for item in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                return ids
+
+    return asyncio.run(pages())
+
+
+def expected_ids(keep):
+    records = [(TIMESTAMPS[i], i + 1, i) for i in range(len(TIMESTAMPS))]
+    return [
+        record_id
+        for created_at, record_id, i in sorted(records, reverse=True)
+        if keep(created_at, i)
+    ]
+
+
+def test_pages_cover_history_newest_first(store):
+    assert read_all(store, limit=3) == expected_ids(lambda t, i: True)
+
+
+@pytest.mark.parametrize(
+    "filters, keep",
+    [
+        ({"since": 1004.0}, lambda t, i: t >= 1004.0),
+        ({"until": 1004.0}, lambda t, i: t < 1004.0),
+        ({"since": 1002.0, "until": 1007.0}, lambda t, i: 1002.0 <= t < 1007.0),
+        ({"success": True, "since": 1003.0}, lambda t, i: i % 2 == 0 and t >= 1003),
+        (
+            {"brand_name": "old TOM", "until": 1008.0},
+            lambda t, i: i % 4 < 2 and t < 1008,
+        ),
+        ({"image_digest": "DIGEST-2"}, lambda t, i: i % 5 == 2),
+    ],
+)
+def test_filters_page_through_matching_records(store, filters, keep):
+    assert read_all(store, limit=2, **filters) == expected_ids(keep)
+
+
+def test_malformed_cursor_is_rejected(store):
+    with pytest.raises(ValueError):
+        asyncio.run(store.query(cursor="not-a-cursor"))
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {},
+        {"since": 1.0},
+        {"until": 1.0},
+        {"since": 1.0, "until": 2.0},
+        {"success": True, "since": 1.0},
+        {"success": False, "until": 2.0, "cursor": "1.5:3"},
+        {"brand_name": "Old Tom", "since": 1.0, "until": 2.0},
+        {"cursor": "1.5:3"},
+    ],
+)
+def test_pages_are_index_range_reads_in_page_order(filters):
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(SCHEMA)
+    sql, params = build_query(**filters)
+    plan = " | ".join(
+        row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+    )
+    assert "USING INDEX idx_verifications" in plan
+    assert "TEMP B-TREE" not in plan
+    if filters:
+        assert plan.startswith("SEARCH verifications")
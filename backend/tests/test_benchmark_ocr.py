@@ -0,0 +1,25 @@
+from benchmark_ocr import expected_matches
+
+
+def make_label(printed, submitted):
+    return {"expected_ocr": printed, "form_submission": submitted}
+
+
+def test_alcohol_content_compares_as_a_number():
+    label = make_label(
+        {"brand_name": "Fancy Vodka", "alcohol_content": 40},
+        {"brand_name": "Fancy Vodka", "alcohol_content": 40.0},
+    )
+    assert expected_matches(label) == {"brand_name": True, "alcohol_content": True}
+
+
+def test_differing_or_unprinted_values_should_not_match():
+    label = make_label(
+        {"brand_name": "Fancy Vodka", "alcohol_content": 13.5},
+        {"brand_name": "Plain Vodka", "alcohol_content": 12, "net_contents": "750 mL"},
+    )
+    assert expected_matches(label) == {
+        "brand_name": False,
+        "alcohol_content": False,
+        "net_contents": False,
+    }
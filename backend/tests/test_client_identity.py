@@ -0,0 +1,68 @@
+import pytest
+from starlette.requests import Request
+from starlette.status import HTTP_401_UNAUTHORIZED
+
+from app.routers.verification import VerificationError, resolve_client
+from app.services import admission_service
+from app.services.admission_service import TrafficClass, client_address
+
+FRONTEND_ORIGIN = "https://nfthomas-ttb-label-app.onrender.com"
+
+
+def make_request(headers, peer="10.0.0.2"):
+    return Request(
+        {
+            "type": "http",
+            "method": "POST",
+            "path": "/api/verify",
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in headers.items()
+            ],
+            "client": (peer, 40000),
+        }
+    )
+
+
+@pytest.fixture
+def behind_one_proxy(monkeypatch):
+    monkeypatch.setattr(admission_service, "TRUSTED_PROXY_HOPS", 1)
+
+
+def test_client_address_ignores_entries_written_by_the_caller():
+    assert client_address("10.0.0.2", "6.6.6.6, 1.2.3.4", hops=1) == "1.2.3.4"
+    assert client_address("10.0.0.2", "6.6.6.6, 1.2.3.4, 10.0.0.1", hops=2) == (
+        "1.2.3.4"
+    )
+    assert client_address("10.0.0.2", "1.2.3.4", hops=0) == "10.0.0.2"
+    assert client_address("10.0.0.2", None, hops=1) == "10.0.0.2"
+
+
+def test_spoofed_forwarded_for_keeps_one_identity(behind_one_proxy):
+    identities = {
+        resolve_client(make_request({"X-Forwarded-For": f"{spoofed}, 1.2.3.4"}))
+        for spoofed in ("6.6.6.6", "7.7.7.7", "8.8.8.8, 9.9.9.9")
+    }
+    assert identities == {("1.2.3.4", TrafficClass.BULK)}
+
+
+def test_frontend_origin_does_not_grant_interactive(behind_one_proxy):
+    request = make_request({"Origin": FRONTEND_ORIGIN, "X-Forwarded-For": "1.2.3.4"})
+    assert resolve_client(request) == ("1.2.3.4", TrafficClass.BULK)
+
+
+def test_api_keys_set_the_class(monkeypatch):
+    monkeypatch.setattr(admission_service, "INTERACTIVE_API_KEYS", {"i-key": "desk"})
+    monkeypatch.setattr(admission_service, "ADMISSION_API_KEYS", {"b-key": "batch"})
+
+    assert resolve_client(make_request({"X-API-Key": "i-key"})) == (
+        "key:desk",
+        TrafficClass.INTERACTIVE,
+    )
+    assert resolve_client(make_request({"X-API-Key": "b-key"})) == (
+        "key:batch",
+        TrafficClass.BULK,
+    )
+    with pytest.raises(VerificationError) as error:
+        resolve_client(make_request({"X-API-Key": "guess"}))
+    assert error.value.status_code == HTTP_401_UNAUTHORIZED
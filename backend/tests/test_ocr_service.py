@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services import ocr_service
+from app.services.ocr_service import OcrResult, extract_text_from_images
+
+
+class StubOcr:
+    """
+    Stands in for run_ocr. Each image's bytes are its text; OCR of an image in
+    `blocked` waits until `release` is set or the request cancels it.
+    """
+
+    def __init__(self, blocked=()):
+        self.blocked = set(blocked)
+        self.release = threading.Event()
+        self.started = []
+        self.cancelled = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, image_bytes, profile, engine, on_pass, use_regions, cancel):
+        text = image_bytes.decode()
+        with self._lock:
+            self.started.append(text)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            if text in self.blocked:
+                # Give up after a while so a missed cancel fails instead of hanging
+                deadline = time.monotonic() + 2
+                while not self.release.wait(0.01) and time.monotonic() < deadline:
+                    if cancel.is_set():
+                        self.cancelled.append(text)
+                        break
+            else:
+                time.sleep(0.02)
+            return OcrResult(text=text)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+@pytest.fixture(autouse=True)
+def executor(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=8)
+    monkeypatch.setattr(ocr_service, "OCR_EXECUTOR", pool)
+    yield
+    pool.shutdown(wait=True)
+
+
+class Hold:
+    """
+    Records the futures passed to `hold` and whether they were still running.
+    """
+
+    def __init__(self):
+        self.futures = []
+        self.running_when_held = []
+
+    def __call__(self, futures):
+        self.futures.extend(futures)
+        self.running_when_held.extend(not future.done() for future in futures)
+
+    def wait(self):
+        for future in self.futures:
+            future.result(timeout=1)
+
+
+def install(monkeypatch, stub, images_per_request=2):
+    monkeypatch.setattr(ocr_service, "run_ocr", stub)
+    monkeypatch.setattr(ocr_service, "OCR_IMAGES_PER_REQUEST", images_per_request)
+
+
+def test_runs_at_most_images_per_request_at_once(monkeypatch):
+    stub = StubOcr()
+    install(monkeypatch, stub, images_per_request=2)
+    images = [f"image {i}".encode() for i in range(5)]
+
+    results = asyncio.run(extract_text_from_images(images, lambda texts: False))
+
+    assert stub.max_running == 2
+    assert {index: r.text for index, r in results.items()} == {
+        i: f"image {i}" for i in range(5)
+    }
+
+
+def test_stops_once_resolved_and_omits_skipped_images(monkeypatch):
+    stub = StubOcr(blocked={"slow"})
+    install(monkeypatch, stub, images_per_request=2)
+    hold = Hold()
+    images = [b"answer", b"slow", b"later", b"last"]
+
+    results = asyncio.run(
+        extract_text_from_images(
+            images, lambda texts: "answer" in texts.values(), hold=hold
+        )
+    )
+    hold.wait()
+
+    assert list(results) == [0]
+    assert stub.started == ["answer", "slow"]
+    # The image still running was handed to `hold` and told to stop
+    assert hold.running_when_held == [True]
+    assert stub.cancelled == ["slow"]
+
+
+def test_cancellation_stops_ocr_and_holds_running_images(monkeypatch):
+    stub = StubOcr(blocked={"a", "b"})
+    install(monkeypatch, stub, images_per_request=2)
+    hold = Hold()
+
+    async def scenario():
+        task = asyncio.create_task(
+            extract_text_from_images([b"a", b"b", b"c"], lambda texts: False, hold=hold)
+        )
+        while len(stub.started) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+
+    hold.wait()
+
+    assert hold.running_when_held == [True, True]
+    assert sorted(stub.cancelled) == ["a", "b"]
+    assert "c" not in stub.started
@@ -0,0 +1,63 @@
+from app.models.verification import LabelData, VerificationResult
+from app.services.verification_service import (
+    combine_ocr_texts,
+    find_field_sources,
+    verify_label,
+)
+
+FORM = LabelData(
+    brand_name="Old Tom Distillery",
+    product_type="Whiskey",
+    alcohol_content=45,
+    net_contents="750 mL",
+)
+
+
+def sources_for(texts):
+    result = verify_label(FORM, combine_ocr_texts(texts))
+    return find_field_sources(FORM, texts, result)
+
+
+def test_each_field_is_credited_to_the_image_it_was_read_on():
+    texts = {0: "OLD TOM DISTILLERY", 1: "Whiskey 45% 750 mL"}
+    assert sources_for(texts) == {
+        "brand_name": 0,
+        "product_type": 1,
+        "alcohol_content": 1,
+        "net_contents": 1,
+    }
+
+
+def test_field_on_several_images_is_credited_to_the_first():
+    texts = {0: "Whiskey 45%", 1: "OLD TOM DISTILLERY Whiskey 750 mL"}
+    assert sources_for(texts) == {
+        "brand_name": 1,
+        "product_type": 0,
+        "alcohol_content": 0,
+        "net_contents": 1,
+    }
+
+
+def test_blank_images_and_mismatches_have_no_source():
+    texts = {0: "  ", 1: "OLD TOM DISTILLERY Whiskey 45%"}
+    assert sources_for(texts) == {
+        "brand_name": 1,
+        "product_type": 1,
+        "alcohol_content": 1,
+    }
+
+
+def test_field_matched_only_across_images_has_no_source():
+    texts = {0: "OLD TOM", 1: "DISTILLERY Whiskey 45% 750 mL"}
+    result = VerificationResult(
+        success=True,
+        matches=dict.fromkeys(
+            ["brand_name", "product_type", "alcohol_content", "net_contents"], True
+        ),
+        mismatches=[],
+        raw_ocr_text=combine_ocr_texts(texts),
+        message="",
+    )
+    sources = find_field_sources(FORM, texts, result)
+    assert "brand_name" not in sources
+    assert sources["product_type"] == 1
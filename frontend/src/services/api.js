@@ -24,6 +24,57 @@ export const verifyLabel = async (formData) => {
   }
 };
 
+// Parse one server-sent event frame ("event: name\ndata: json")
+const parseEvent = (frame) => {
+  let event = 'message';
+  const data = [];
+  for (const line of frame.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim();
+    else if (line.startsWith('data:')) data.push(line.slice(5).trim());
+  }
+  return { event, data: data.length ? JSON.parse(data.join('\n')) : null };
+};
+
+// Same as verifyLabel, but calls onEvent(event, data) for each progress event
+// (accepted, ocr_pass, field) as the server sends it and resolves with the
+// final result
+export const verifyLabelStream = async (formData, onEvent) => {
+  let response;
+  try {
+    response = await fetch(`${api.defaults.baseURL}/api/verify/stream`, {
+      method: 'POST',
+      body: formData,
+    });
+  } catch {
+    throw new Error('Network error occurred');
+  }
+  if (!response.ok) {
+    const body = await response.json().catch(() => ({}));
+    throw new Error(body.detail || 'Verification failed');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let end;
+    while ((end = buffer.indexOf('\n\n')) !== -1) {
+      const { event, data } = parseEvent(buffer.slice(0, end));
+      buffer = buffer.slice(end + 2);
+      if (event === 'result') return data;
+      if (event === 'error') {
+        throw new Error(data.detail || 'Verification failed');
+      }
+      onEvent(event, data);
+    }
+  }
+  throw new Error('Connection closed before verification finished');
+};
+
 export const healthCheck = () => api.get('/api/health');
 
 export default api;
@@ -3,3 +3,12 @@ export const formatFileSize = (sizeInBytes) => {
   const kb = sizeInBytes / 1024;
   return kb < 1024 ? `${Math.round(kb)} KB` : `${(kb / 1024).toFixed(1)} MB`;
 };
+
+export const formatFieldName = (key) => {
+  return key
+    .replace(/_/g, ' ') // Replace underscores with spaces
+    .replace(/([A-Z])/g, ' $1') // Add space before capital letters
+    .replace(/^./, (str) => str.toUpperCase()) // Capitalize first letter
+    .replace(/\s+/g, ' ') // Remove any double spaces
+    .trim(); // Remove any leading/trailing spaces
+};
@@ -0,0 +1,339 @@
+"""
+Test Label Augmenter
+
+Builds large OCR benchmark corpora from the rendered test labels by applying
+seeded, randomized degradations with NumPy/OpenCV: blur, noise, JPEG artifacts,
+perspective, rotation, glare and reduced resolution.
+
+Each variant is written next to a metadata file that carries over the source
+label's expected OCR results and form submission, plus the exact augmentation
+parameters used. Variants are generated in batches across worker processes and
+are reproducible for a given ``--seed``.
+
+Usage:
+    python augment_labels.py                            # 100 variants per label
+    python augment_labels.py --variants 500 --workers 8
+    python augment_labels.py --ops blur,noise,jpeg       # Restrict degradations
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any
+
+import cv2
+import numpy as np
+
+# Ordered so that geometric changes happen before sensor/compression artifacts
+OPERATIONS = (
+    "perspective",
+    "rotation",
+    "glare",
+    "blur",
+    "resolution",
+    "noise",
+    "jpeg",
+)
+# Probability that each operation is applied to a variant
+DEFAULT_PROBABILITY = 0.5
+
+
+def augment_perspective(
+    image: np.ndarray, rng: np.random.Generator
+) -> tuple[np.ndarray, dict[str, Any]]:
+    h, w = image.shape[:2]
+    strength = float(rng.uniform(0.02, 0.08))
+    src = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    jitter = rng.uniform(-strength, strength, size=(4, 2)) * np.array([w, h])
+    dst = (src + jitter).astype(np.float32)
+    matrix = cv2.getPerspectiveTransform(src, dst)
+    warped = cv2.warpPerspective(image, matrix, (w, h), borderMode=cv2.BORDER_REPLICATE)
+    return warped, {"strength": round(strength, 4)}
+
+
+def augment_rotation(
+    image: np.ndarray, rng: np.random.Generator
+) -> tuple[np.ndarray, dict[str, Any]]:
+    h, w = image.shape[:2]
+    angle = float(rng.uniform(-10.0, 10.0))
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    rotated = cv2.warpAffine(image, matrix, (w, h), borderMode=cv2.BORDER_REPLICATE)
+    return rotated, {"angle": round(angle, 2)}
+
+
+def augment_glare(
+    image: np.ndarray, rng: np.random.Generator
+) -> tuple[np.ndarray, dict[str, Any]]:
+    h, w = image.shape[:2]
+    cx, cy = float(rng.uniform(0, w)), float(rng.uniform(0, h))
+    radius = float(rng.uniform(0.15, 0.4)) * max(w, h)
+    intensity = float(rng.uniform(0.3, 0.8))
+    # Gaussian hotspot over the whole frame, computed in one vectorized pass
+    yy, xx = np.ogrid[:h, :w]
+    dist_sq = (xx - cx) ** 2 + (yy - cy) ** 2
+    mask = np.exp(-dist_sq / (2 * radius**2)) * intensity
+    glared = image.astype(np.float32)
+    glared += (255.0 - glared) * mask[..., None]
+    return np.clip(glared, 0, 255).astype(np.uint8), {
+        "center": [round(cx), round(cy)],
+        "radius": round(radius),
+        "intensity": round(intensity, 3),
+    }
+
+
+def augment_blur(
+    image: np.ndarray, rng: np.random.Generator
+) -> tuple[np.ndarray, dict[str, Any]]:
+    sigma = float(rng.uniform(0.5, 3.0))
+    blurred = cv2.GaussianBlur(image, (0, 0), sigmaX=sigma)
+    return blurred, {"sigma": round(sigma, 3)}
+
+
+def augment_resolution(
+    image: np.ndarray, rng: np.random.Generator
+) -> tuple[np.ndarray, dict[str, Any]]:
+    h, w = image.shape[:2]
+    scale = float(rng.uniform(0.25, 0.75))
+    small = cv2.resize(
+        image,
+        (max(1, int(w * scale)), max(1, int(h * scale))),
+        interpolation=cv2.INTER_AREA,
+    )
+    restored = cv2.resize(small, (w, h), interpolation=cv2.INTER_LINEAR)
+    return restored, {"scale": round(scale, 3)}
+
+
+def augment_noise(
+    image: np.ndarray, rng: np.random.Generator
+) -> tuple[np.ndarray, dict[str, Any]]:
+    sigma = float(rng.uniform(4.0, 20.0))
+    noise = rng.normal(0.0, sigma, size=image.shape).astype(np.float32)
+    noisy = np.clip(image.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+    return noisy, {"sigma": round(sigma, 2)}
+
+
+def augment_jpeg(
+    image: np.ndarray, rng: np.random.Generator
+) -> tuple[np.ndarray, dict[str, Any]]:
+    quality = int(rng.integers(10, 60))
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    if not ok:
+        return image, {"quality": None}
+    return cv2.imdecode(encoded, cv2.IMREAD_UNCHANGED), {"quality": quality}
+
+
+AUGMENTERS = {
+    "perspective": augment_perspective,
+    "rotation": augment_rotation,
+    "glare": augment_glare,
+    "blur": augment_blur,
+    "resolution": augment_resolution,
+    "noise": augment_noise,
+    "jpeg": augment_jpeg,
+}
+
+
+def variant_seed(base_seed: int, test_id: str, index: int) -> int:
+    """Stable per-variant seed, independent of worker scheduling"""
+    digest = hashlib.sha256(f"{base_seed}:{test_id}:{index}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+def augment_image(
+    image: np.ndarray,
+    rng: np.random.Generator,
+    operations: list[str],
+    probability: float,
+) -> tuple[np.ndarray, list[dict[str, Any]]]:
+    applied = []
+    for name in operations:
+        if rng.random() >= probability:
+            continue
+        image, params = AUGMENTERS[name](image, rng)
+        applied.append({"operation": name, **params})
+
+    # Always degrade at least once so no variant duplicates its source
+    if not applied:
+        name = operations[int(rng.integers(len(operations)))]
+        image, params = AUGMENTERS[name](image, rng)
+        applied.append({"operation": name, **params})
+
+    return image, applied
+
+
+def load_sources(input_dir: Path) -> list[tuple[Path, dict[str, Any]]]:
+    sources = []
+    for metadata_path in sorted(input_dir.glob("*.json")):
+        image_path = metadata_path.with_suffix(".png")
+        if not image_path.exists():
+            continue
+        with open(metadata_path) as f:
+            sources.append((image_path, json.load(f)))
+    return sources
+
+
+def generate_batch(
+    image_path: Path,
+    metadata: dict[str, Any],
+    indices: list[int],
+    output_dir: Path,
+    seed: int,
+    operations: list[str],
+    probability: float,
+) -> int:
+    """Worker entry point: decode the source once, write a batch of variants"""
+    source = cv2.imread(str(image_path), cv2.IMREAD_COLOR)
+    if source is None:
+        raise ValueError(f"Unable to read image: {image_path}")
+
+    test_id = metadata["test_id"]
+    for index in indices:
+        rng = np.random.default_rng(variant_seed(seed, test_id, index))
+        image, applied = augment_image(source, rng, operations, probability)
+
+        variant_id = f"{test_id}__aug{index:05d}"
+        cv2.imwrite(str(output_dir / f"{variant_id}.png"), image)
+        with open(output_dir / f"{variant_id}.json", "w") as f:
+            json.dump(
+                {
+                    **metadata,
+                    "test_id": variant_id,
+                    "source_test_id": test_id,
+                    "augmentation": {"seed": seed, "index": index, "ops": applied},
+                },
+                f,
+                indent=2,
+            )
+
+    return len(indices)
+
+
+def augment_all(
+    input_dir: Path,
+    output_dir: Path,
+    variants: int,
+    seed: int,
+    operations: list[str],
+    probability: float,
+    workers: int,
+    batch_size: int,
+) -> int:
+    """Generate seeded variants for every rendered label in input_dir"""
+    sources = load_sources(input_dir)
+    if not sources:
+        print(f"No labels found in {input_dir}", file=sys.stderr)
+        return 1
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    total = len(sources) * variants
+    print(
+        f"Generating {total} variant(s) from {len(sources)} label(s) "
+        f"with {workers} worker(s)..."
+    )
+
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for image_path, metadata in sources:
+            for start in range(0, variants, batch_size):
+                indices = list(range(start, min(start + batch_size, variants)))
+                future = executor.submit(
+                    generate_batch,
+                    image_path,
+                    metadata,
+                    indices,
+                    output_dir,
+                    seed,
+                    operations,
+                    probability,
+                )
+                futures[future] = metadata.get("test_id", image_path.stem)
+
+        for future in as_completed(futures):
+            try:
+                done += future.result()
+            except Exception as e:
+                print(f"Error augmenting {futures[future]}: {e}", file=sys.stderr)
+                executor.shutdown(cancel_futures=True)
+                return 1
+            print(f"  {done}/{total}", end="\r")
+
+    print(f"\nSuccessfully generated {done} variant(s) in {output_dir}")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate degraded variants of test label images"
+    )
+    parser.add_argument(
+        "--input",
+        type=Path,
+        default=Path("output"),
+        help="Directory of rendered labels and their JSON metadata",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("augmented"),
+        help="Output directory for augmented variants",
+    )
+    parser.add_argument(
+        "--variants",
+        type=int,
+        default=100,
+        help="Number of variants per label",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Base random seed")
+    parser.add_argument(
+        "--ops",
+        type=str,
+        default=",".join(OPERATIONS),
+        help=f"Comma-separated degradations to sample from ({', '.join(OPERATIONS)})",
+    )
+    parser.add_argument(
+        "--probability",
+        type=float,
+        default=DEFAULT_PROBABILITY,
+        help="Probability that each degradation is applied to a variant",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=50,
+        help="Variants generated per worker task",
+    )
+
+    args = parser.parse_args()
+
+    operations = [op.strip() for op in args.ops.split(",") if op.strip()]
+    unknown = [op for op in operations if op not in AUGMENTERS]
+    if unknown or not operations:
+        parser.error(f"Unknown degradation(s): {', '.join(unknown) or '(none)'}")
+    # Keep the canonical ordering regardless of how --ops was written
+    operations = [op for op in OPERATIONS if op in operations]
+
+    return augment_all(
+        args.input,
+        args.output,
+        variants=max(1, args.variants),
+        seed=args.seed,
+        operations=operations,
+        probability=args.probability,
+        workers=max(1, args.workers),
+        batch_size=max(1, args.batch_size),
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
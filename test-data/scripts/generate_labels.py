@@ -4,11 +4,19 @@ Test Label Image Generator
 Generates alcohol label test images from YAML configuration using Playwright.
 Designed for CI/CD integration and E2E testing compatibility.
 
+A single Chromium instance is shared across the run and labels are rendered on
+parallel pages. Cases whose YAML entry, template and render options are unchanged
+since the last run are skipped (tracked in ``output/.manifest.json``).
+
 Usage:
-    python generate_labels.py                    # Generate all labels
+    python generate_labels.py                    # Generate new/changed labels
+    python generate_labels.py --force            # Regenerate all labels
+    python generate_labels.py --jobs 8           # Render 8 pages in parallel
 """
 
 import argparse
+import asyncio
+import hashlib
 import json
 import sys
 from pathlib import Path
@@ -16,7 +24,14 @@ from typing import Any
 
 import yaml
 from jinja2 import Environment, FileSystemLoader
-from playwright.sync_api import sync_playwright
+from playwright.async_api import Browser, async_playwright
+
+TEMPLATE_NAME = "label.html"
+MANIFEST_NAME = ".manifest.json"
+# Bump when the rendering pipeline changes in a way that invalidates output
+GENERATOR_VERSION = 1
+# Viewport size to accommodate label dimensions
+VIEWPORT = {"width": 1000, "height": 1300}
 
 
 def load_config(config_path: Path) -> dict[str, Any]:
@@ -29,7 +44,7 @@ def load_config(config_path: Path) -> dict[str, Any]:
 
 
 def render_html(template_env: Environment, test_case: dict[str, Any]) -> str:
-    template = template_env.get_template("label.html")
+    template = template_env.get_template(TEMPLATE_NAME)
 
     # Prepare template context
     display_options = test_case.get("display_options", {})
@@ -45,27 +60,65 @@ def render_html(template_env: Environment, test_case: dict[str, Any]) -> str:
     return template.render(**context)
 
 
-def generate_image(
-    test_case: dict[str, Any], html_content: str, output_dir: Path
+def case_fingerprint(test_case: dict[str, Any], template_source: str) -> str:
+    """Hash of everything that affects a case's rendered image and metadata"""
+    payload = json.dumps(
+        {
+            "test_case": test_case,
+            "template": template_source,
+            "viewport": VIEWPORT,
+            "version": GENERATOR_VERSION,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def load_manifest(output_dir: Path) -> dict[str, str]:
+    try:
+        with open(output_dir / MANIFEST_NAME) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir: Path, manifest: dict[str, str]) -> None:
+    with open(output_dir / MANIFEST_NAME, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def is_up_to_date(
+    test_case: dict[str, Any],
+    fingerprint: str,
+    manifest: dict[str, str],
+    output_dir: Path,
+) -> bool:
+    test_id = test_case["id"]
+    return (
+        manifest.get(test_id) == fingerprint
+        and (output_dir / f"{test_id}.png").exists()
+        and (output_dir / f"{test_id}.json").exists()
+    )
+
+
+async def generate_image(
+    browser: Browser, test_case: dict[str, Any], html_content: str, output_dir: Path
 ) -> Path:
     output_path = output_dir / f"{test_case['id']}.png"
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-
-        page.set_content(html_content, wait_until="networkidle")
-        # Set viewport size to accommodate label dimensions
-        page.set_viewport_size({"width": 1000, "height": 1300})
+    page = await browser.new_page(viewport=VIEWPORT)
+    try:
+        await page.set_content(html_content, wait_until="networkidle")
 
         # Capture only the .label div
-        label = page.query_selector(".label")
+        label = await page.query_selector(".label")
         if label:
-            label.screenshot(path=output_path, type="png")
+            await label.screenshot(path=output_path, type="png")
         else:
-            page.screenshot(path=output_path, type="png")
-
-        browser.close()
+            await page.screenshot(path=output_path, type="png")
+    finally:
+        await page.close()
 
     return output_path
 
@@ -86,43 +139,113 @@ def generate_metadata(test_case: dict[str, Any], output_dir: Path) -> Path:
     return output_path
 
 
-def generate_all(config_path: Path, template_dir: Path, output_dir: Path) -> int:
-    """Generate all test images"""
+async def render_cases(
+    jinja_env: Environment,
+    test_cases: list[dict[str, Any]],
+    output_dir: Path,
+    jobs: int,
+) -> list[str]:
+    """Render test cases on parallel pages of one browser; returns generated ids"""
+    semaphore = asyncio.Semaphore(jobs)
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch()
+
+        async def render_one(tc: dict[str, Any]) -> str | None:
+            async with semaphore:
+                try:
+                    html = render_html(jinja_env, tc)
+                    image_path = await generate_image(browser, tc, html, output_dir)
+                    metadata_path = generate_metadata(tc, output_dir)
+                except KeyError as e:
+                    print(
+                        f"Error in test case {tc.get('id', 'unknown')}: "
+                        f"missing key {e}",
+                        file=sys.stderr,
+                    )
+                    return None
+                except Exception as e:
+                    print(
+                        f"Error generating test case {tc.get('id', 'unknown')}: {e}",
+                        file=sys.stderr,
+                    )
+                    return None
+                print(f"  - {tc['id']}: {tc['description']}")
+                print(f"    Image: {image_path}")
+                print(f"    Metadata: {metadata_path}")
+                return tc["id"]
+
+        try:
+            results = await asyncio.gather(*(render_one(tc) for tc in test_cases))
+        finally:
+            await browser.close()
+
+    return [tc_id for tc_id in results if tc_id is not None]
+
+
+def generate_all(
+    config_path: Path,
+    template_dir: Path,
+    output_dir: Path,
+    jobs: int = 4,
+    force: bool = False,
+) -> int:
+    """Generate test images for new or changed test cases"""
     config = load_config(config_path)
     output_dir.mkdir(parents=True, exist_ok=True)
 
     # Setup Jinja2 environment
     jinja_env = Environment(loader=FileSystemLoader(template_dir), autoescape=True)
+    template_source = (template_dir / TEMPLATE_NAME).read_text()
 
     test_cases = config.get("test_cases", [])
     if not test_cases:
         print("No test cases found in config", file=sys.stderr)
         return 1
 
-    print(f"Generating {len(test_cases)} test image(s)...")
-
+    manifest = {} if force else load_manifest(output_dir)
+    fingerprints = {}
+    pending = []
     for tc in test_cases:
+        tc_id = tc.get("id", "unknown")
         try:
-            print(f"  - {tc['id']}: {tc['description']}")
-            html = render_html(jinja_env, tc)
-            image_path = generate_image(tc, html, output_dir)
-            metadata_path = generate_metadata(tc, output_dir)
-            print(f"    Image: {image_path}")
-            print(f"    Metadata: {metadata_path}")
+            fingerprints[tc_id] = case_fingerprint(tc, template_source)
+            if not is_up_to_date(tc, fingerprints[tc_id], manifest, output_dir):
+                pending.append(tc)
         except KeyError as e:
-            print(
-                f"Error in test case {tc.get('id', 'unknown')}: missing key {e}",
-                file=sys.stderr,
-            )
+            print(f"Error in test case {tc_id}: missing key {e}", file=sys.stderr)
             return 1
-        except Exception as e:
-            print(
-                f"Error generating test case {tc.get('id', 'unknown')}: {e}",
-                file=sys.stderr,
+
+    skipped = len(test_cases) - len(pending)
+    print(f"Generating {len(pending)} test image(s), {skipped} unchanged...")
+
+    generated = []
+    if pending:
+        try:
+            generated = asyncio.run(
+                render_cases(jinja_env, pending, output_dir, max(1, jobs))
             )
+        except Exception as e:
+            print(f"Error launching browser: {e}", file=sys.stderr)
             return 1
 
-    print(f"\nSuccessfully generated {len(test_cases)} label(s)")
+    # Only record cases whose image and metadata were both written, so failed
+    # cases are retried on the next run, and drop entries for cases no longer
+    # in the config
+    updated = {k: v for k, v in manifest.items() if k in fingerprints}
+    for tc_id in generated:
+        updated[tc_id] = fingerprints[tc_id]
+    if updated != manifest:
+        save_manifest(output_dir, updated)
+
+    if len(generated) != len(pending):
+        print(
+            f"\nFailed to generate {len(pending) - len(generated)} label(s)",
+            file=sys.stderr,
+        )
+        return 1
+
+    print(f"\nSuccessfully generated {len(generated)} label(s)")
     return 0
 
 
@@ -146,10 +269,23 @@ def main():
         default=Path("output"),
         help="Output directory for generated images",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=4,
+        help="Number of pages rendered in parallel",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate all labels, ignoring the manifest of previous runs",
+    )
 
     args = parser.parse_args()
 
-    return generate_all(args.config, args.templates, args.output)
+    return generate_all(
+        args.config, args.templates, args.output, jobs=args.jobs, force=args.force
+    )
 
 
 if __name__ == "__main__":